@@ -1,13 +1,24 @@
+import time
+_startup_start = time.perf_counter() # Taken before the other imports for the startup report
+import argparse
+import collections
+import csv
+import json
+import multiprocessing
+import os
+import queue
+import statistics
+import struct
+import sys
+import threading
 import pygame
 import random
-
-pygame.init()
+import numpy as np
 
 # --- Display ---
 screen_width = 800
 screen_height = 600
-screen = pygame.display.set_mode((screen_width, screen_height))
-pygame.display.set_caption("Super Hero Adventure")
+screen = None # Created by init_game()
 
 # --- Colors ---
 BLACK = (0, 0, 0)
@@ -19,16 +30,201 @@ YELLOW = (255, 255, 0)
 PURPLE = (128, 0, 128)
 ORANGE = (255, 165, 0)
 
+# --- Sprite Art Cache ---
+# Every look is drawn once, converted to the display format and then shared
+# by all sprites that use it, so spawning a sprite does no drawing at all.
+def _draw_player():
+    image = pygame.Surface((50, 50))
+    image.fill(BLUE)
+    # Add a simple design to make it look cooler
+    pygame.draw.circle(image, WHITE, (25, 25), 20, 3)
+    pygame.draw.rect(image, YELLOW, (20, 20, 10, 10))
+    return image
+
+def _draw_projectile():
+    image = pygame.Surface((15, 5))
+    image.fill(YELLOW)
+    # Make it look more like a laser
+    pygame.draw.rect(image, WHITE, (2, 1, 11, 3))
+    return image
+
+def _draw_enemy_default():
+    image = pygame.Surface((40, 40))
+    image.fill(BLACK)
+    return image
+
+def _draw_enemy_normal():
+    image = pygame.Surface((40, 40))
+    image.fill(RED)
+    pygame.draw.polygon(image, WHITE, [(20, 5), (35, 35), (5, 35)])
+    return image
+
+def _draw_enemy_fast():
+    image = pygame.Surface((30, 30))
+    image.fill(ORANGE)
+    pygame.draw.circle(image, WHITE, (15, 15), 10, 2)
+    return image
+
+def _draw_enemy_strong():
+    image = pygame.Surface((50, 50))
+    image.fill(PURPLE)
+    pygame.draw.rect(image, WHITE, (10, 10, 30, 30), 3)
+    return image
+
+def _draw_boss():
+    image = pygame.Surface((80, 80))
+    image.fill(WHITE)
+    pygame.draw.rect(image, RED, (10, 10, 60, 60))
+    pygame.draw.circle(image, YELLOW, (40, 40), 25, 4)
+    return image
+
+def _draw_collectible(color, design):
+    def draw():
+        image = pygame.Surface((20, 20))
+        image.fill(color)
+        design(image)
+        return image
+    return draw
+
+def _draw_explosion_frame(size):
+    def draw():
+        image = pygame.Surface((size*2, size*2))
+        image.set_colorkey(BLACK) # Make background transparent
+        pygame.draw.circle(image, YELLOW, (size, size), size)
+        pygame.draw.circle(image, ORANGE, (size, size), size//2)
+        return image
+    return draw
+
+EXPLOSION_SIZES = [10, 20, 30, 20, 10]
+
+SPRITE_ART = {
+    "player": _draw_player,
+    "projectile": _draw_projectile,
+    "enemy_default": _draw_enemy_default,
+    "enemy_normal": _draw_enemy_normal,
+    "enemy_fast": _draw_enemy_fast,
+    "enemy_strong": _draw_enemy_strong,
+    "boss": _draw_boss,
+    "collectible_health": _draw_collectible(GREEN, lambda image: pygame.draw.polygon(
+        image, WHITE, [(10, 2), (18, 10), (10, 18), (2, 10)])),
+    "collectible_weapon_upgrade": _draw_collectible(YELLOW, lambda image: pygame.draw.circle(
+        image, WHITE, (10, 10), 8, 2)),
+    "collectible_extra_life": _draw_collectible(BLUE, lambda image: pygame.draw.rect(
+        image, WHITE, (5, 5, 10, 10))),
+    "collectible_score_boost": _draw_collectible(PURPLE, lambda image: pygame.draw.circle(
+        image, WHITE, (10, 10), 6)),
+}
+for size in set(EXPLOSION_SIZES):
+    SPRITE_ART[f"explosion_{size}"] = _draw_explosion_frame(size)
+
+sprite_images = {}
+
+def get_image(key):
+    image = sprite_images.get(key)
+    if image is None:
+        image = SPRITE_ART[key]()
+        # Match the display pixel format so blits take the fast path
+        if pygame.display.get_surface() is not None:
+            if image.get_flags() & pygame.SRCALPHA:
+                image = image.convert_alpha()
+            else:
+                image = image.convert()
+        sprite_images[key] = image
+    return image
+
+def get_explosion_frames():
+    frames = sprite_images.get("explosion")
+    if frames is None:
+        frames = [get_image(f"explosion_{size}") for size in EXPLOSION_SIZES]
+        sprite_images["explosion"] = frames
+    return frames
+
+# --- Event Log ---
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30}
+
+class EventLog:
+    """Structured game events (spawn, kill, damage, pickup, level) in a ring buffer.
+
+    Logging only appends to an in-memory deque, and the message is formatted
+    with its args when it is read, so the game loop never waits on I/O. An
+    optional background thread writes events to a file.
+    """
+    def __init__(self, capacity=1000, min_level="debug"):
+        self.events = collections.deque(maxlen=capacity) # Oldest events drop off
+        self.min_level = LOG_LEVELS[min_level]
+        self._queue = None # Set while a flusher thread is running
+        self._thread = None
+
+    def log(self, level, category, message, *args):
+        if LOG_LEVELS[level] < self.min_level:
+            return
+        event = (sim_step, level, category, message, args)
+        self.events.append(event)
+        if self._queue is not None:
+            self._queue.put(event)
+
+    def debug(self, category, message, *args):
+        self.log("debug", category, message, *args)
+
+    def info(self, category, message, *args):
+        self.log("info", category, message, *args)
+
+    def warning(self, category, message, *args):
+        self.log("warning", category, message, *args)
+
+    @staticmethod
+    def format(event):
+        step, level, category, message, args = event
+        return f"{step:>7} {level:<7} {category:<7} {message % args if args else message}"
+
+    def recent(self, count=None):
+        # The last count events (all that are kept if count is None), formatted
+        events = list(self.events)
+        if count is not None:
+            events = events[-count:]
+        return [self.format(event) for event in events]
+
+    def start_flusher(self, path):
+        # Writes every new event to path ("-" for stdout) from a background thread
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._flush_events, args=(path,), daemon=True)
+        self._thread.start()
+
+    def _flush_events(self, path):
+        out = sys.stdout if path == "-" else open(path, "a")
+        try:
+            while True:
+                event = self._queue.get()
+                if event is None:
+                    break
+                out.write(self.format(event) + "\n")
+                if self._queue.empty():
+                    out.flush()
+        finally:
+            out.flush()
+            if out is not sys.stdout:
+                out.close()
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            self._queue = None
+
+event_log = EventLog()
+
+# --- Input ---
+def live_keys():
+    return pygame.key.get_pressed()
+
+key_source = live_keys # Swapped out for scripted input by the benchmark
+
 # --- Player Class ---
 class Player(pygame.sprite.Sprite):
     def __init__(self, x, y):
         super().__init__()
-        self.image = pygame.Surface((50, 50))
-        self.image.fill(BLUE)
-        # Add a simple design to make it look cooler
-        pygame.draw.circle(self.image, WHITE, (25, 25), 20, 3)
-        pygame.draw.rect(self.image, YELLOW, (20, 20, 10, 10))
-        
+        self.image = get_image("player")
         self.rect = self.image.get_rect(topleft=(x, y))
         self.speed_x = 0
         self.speed_y = 0
@@ -57,7 +253,7 @@ class Player(pygame.sprite.Sprite):
             self.shoot_delay -= 1
 
     def handle_input(self):
-        keys = pygame.key.get_pressed()
+        keys = key_source()
         if keys[pygame.K_LEFT]:
             self.speed_x = -5
         elif keys[pygame.K_RIGHT]:
@@ -84,49 +280,51 @@ class Player(pygame.sprite.Sprite):
     def shoot(self):
         if self.weapon_level == 1:
             # Single shot
-            projectile = Projectile(self.rect.centerx, self.rect.centery)
-            all_sprites.add(projectile)
-            projectiles.add(projectile)
+            fire_projectile(self.rect.centerx, self.rect.centery)
         elif self.weapon_level == 2:
             # Double shot
-            projectile1 = Projectile(self.rect.centerx, self.rect.top + 10)
-            projectile2 = Projectile(self.rect.centerx, self.rect.bottom - 10)
-            all_sprites.add(projectile1)
-            all_sprites.add(projectile2)
-            projectiles.add(projectile1)
-            projectiles.add(projectile2)
+            fire_projectile(self.rect.centerx, self.rect.top + 10)
+            fire_projectile(self.rect.centerx, self.rect.bottom - 10)
         elif self.weapon_level == 3:
             # Triple shot
             # Spreads projectiles slightly vertically
-            projectile1 = Projectile(self.rect.centerx, self.rect.centery - 15)
-            projectile2 = Projectile(self.rect.centerx, self.rect.centery)
-            projectile3 = Projectile(self.rect.centerx, self.rect.centery + 15)
-            all_sprites.add(projectile1)
-            all_sprites.add(projectile2)
-            all_sprites.add(projectile3)
-            projectiles.add(projectile1)
-            projectiles.add(projectile2)
-            projectiles.add(projectile3)
+            fire_projectile(self.rect.centerx, self.rect.centery - 15)
+            fire_projectile(self.rect.centerx, self.rect.centery)
+            fire_projectile(self.rect.centerx, self.rect.centery + 15)
 
 # --- Projectile Class ---
 class Projectile(pygame.sprite.Sprite):
     def __init__(self, x, y):
         super().__init__()
-        self.image = pygame.Surface((15, 5))
-        self.image.fill(YELLOW)
-        # Make it look more like a laser
-        pygame.draw.rect(self.image, WHITE, (2, 1, 11, 3))
-        
+        self.image = get_image("projectile")
         self.rect = self.image.get_rect(center=(x, y))
         self.speed_x = 12
         self.damage = 20
 
+    def reset(self, x, y):
+        # Called when the projectile is handed out again by projectile_pool
+        self.rect.center = (x, y)
+
     def update(self):
         self.rect.x += self.speed_x
         if self.rect.left > screen_width:
             self.kill()
 
+    def kill(self):
+        # A projectile can be killed twice in one frame (it hits two enemies),
+        # so only hand it back to the pool the first time
+        if self.alive():
+            super().kill()
+            projectile_pool.release(self)
+
 # --- Enemy Class ---
+# Health and speed of the plain enemy types (the boss has its own class)
+ENEMY_TYPES = {
+    "normal": {"health": 30, "speed_x": -2},
+    "fast": {"health": 20, "speed_x": -4},
+    "strong": {"health": 60, "speed_x": -1},
+}
+
 class Enemy(pygame.sprite.Sprite):
     def __init__(self, x, y, enemy_type="normal"):
         super().__init__()
@@ -134,34 +332,19 @@ class Enemy(pygame.sprite.Sprite):
         
         # Initialize self.image and self.rect with default values FIRST
         # This prevents AttributeError if specific enemy_type doesn't set it immediately
-        self.image = pygame.Surface((40, 40)) # Default size
-        self.image.fill(BLACK) # Default color
+        self.image = get_image("enemy_default") # Default 40x40 black image
         self.rect = self.image.get_rect(topleft=(x, y)) # Initial rect based on default image
         
         self.health = 1 # Default health
         self.speed_x = 0 # Default speed
 
-        if enemy_type == "normal":
-            self.image = pygame.Surface((40, 40))
-            self.image.fill(RED)
-            pygame.draw.polygon(self.image, WHITE, [(20, 5), (35, 35), (5, 35)]) 
-            self.health = 30
-            self.speed_x = -2
-        elif enemy_type == "fast":
-            self.image = pygame.Surface((30, 30))
-            self.image.fill(ORANGE)
-            pygame.draw.circle(self.image, WHITE, (15, 15), 10, 2)
-            self.health = 20
-            self.speed_x = -4
-        elif enemy_type == "strong":
-            self.image = pygame.Surface((50, 50))
-            self.image.fill(PURPLE)
-            pygame.draw.rect(self.image, WHITE, (10, 10, 30, 30), 3)
-            self.health = 60
-            self.speed_x = -1
+        if enemy_type in ENEMY_TYPES:
+            self.image = get_image("enemy_" + enemy_type)
+            self.health = ENEMY_TYPES[enemy_type]["health"]
+            self.speed_x = ENEMY_TYPES[enemy_type]["speed_x"]
         elif enemy_type == "boss": 
             # For boss, Enemy.__init__ sets placeholders; Boss.__init__ will define its own image/rect
-            self.image = pygame.Surface((1,1)) # Minimal placeholder
+            # (the default image is kept as the placeholder - nothing is drawn for it)
             self.health = 200 # Set boss health here too (will be re-set in Boss.__init__)
             self.speed_x = -0.5 # Set boss speed here too (will be re-set in Boss.__init__)
 
@@ -174,7 +357,7 @@ class Enemy(pygame.sprite.Sprite):
         self.rect.x += self.speed_x
         # Enemies disappear when they go off-screen to the left
         if self.rect.right < 0:
-            print(f"Enemy {self.enemy_type} killed (off-screen left) at X: {self.rect.x}") # Debugging
+            event_log.debug("kill", "Enemy %s killed (off-screen left) at X: %d", self.enemy_type, self.rect.x)
             self.kill()
 
 # --- Boss Class ---
@@ -182,10 +365,7 @@ class Boss(Enemy): # Boss inherits from Enemy
     def __init__(self, x, y):
         # Call parent constructor with boss type
         super().__init__(x, y, "boss") 
-        self.image = pygame.Surface((80, 80))
-        self.image.fill(WHITE)
-        pygame.draw.rect(self.image, RED, (10, 10, 60, 60))
-        pygame.draw.circle(self.image, YELLOW, (40, 40), 25, 4)
+        self.image = get_image("boss")
         self.health = 200 # Boss health
         self.max_health = 200
         self.speed_x = -1
@@ -216,24 +396,8 @@ class Collectible(pygame.sprite.Sprite):
     def __init__(self, x, y, type):
         super().__init__()
         self.type = type
-        
-        if type == "health":
-            self.image = pygame.Surface((20, 20))
-            self.image.fill(GREEN)
-            pygame.draw.polygon(self.image, WHITE, [(10, 2), (18, 10), (10, 18), (2, 10)])
-        elif type == "weapon_upgrade":
-            self.image = pygame.Surface((20, 20))
-            self.image.fill(YELLOW)
-            pygame.draw.circle(self.image, WHITE, (10, 10), 8, 2)
-        elif type == "extra_life":
-            self.image = pygame.Surface((20, 20))
-            self.image.fill(BLUE)
-            pygame.draw.rect(self.image, WHITE, (5, 5, 10, 10))
-        elif type == "score_boost":
-            self.image = pygame.Surface((20, 20))
-            self.image.fill(PURPLE)
-            pygame.draw.circle(self.image, WHITE, (10, 10), 6)
-            
+        # One image per type: health, weapon_upgrade, extra_life, score_boost
+        self.image = get_image("collectible_" + type)
         self.rect = self.image.get_rect(center=(x, y))
 
     def update(self):
@@ -246,15 +410,15 @@ class Collectible(pygame.sprite.Sprite):
 class Explosion(pygame.sprite.Sprite):
     def __init__(self, x, y):
         super().__init__()
-        self.images = []
-        # Create simple explosion animation
-        for size in [10, 20, 30, 20, 10]:
-            img = pygame.Surface((size*2, size*2))
-            img.set_colorkey(BLACK) # Make background transparent
-            pygame.draw.circle(img, YELLOW, (size, size), size)
-            pygame.draw.circle(img, ORANGE, (size, size), size//2)
-            self.images.append(img)
-        
+        # Simple explosion animation, shared by every explosion
+        self.images = get_explosion_frames()
+        self.current_image = 0
+        self.image = self.images[0]
+        self.rect = self.image.get_rect(center=(x, y))
+        self.timer = 0
+
+    def reset(self, x, y):
+        # Called when the explosion is handed out again by explosion_pool
         self.current_image = 0
         self.image = self.images[0]
         self.rect = self.image.get_rect(center=(x, y))
@@ -270,296 +434,1760 @@ class Explosion(pygame.sprite.Sprite):
             else:
                 self.image = self.images[self.current_image]
 
+    def kill(self):
+        if self.alive():
+            super().kill()
+            explosion_pool.release(self)
+
+# --- Sprite Pools ---
+# Projectiles and explosions are created and thrown away constantly, so
+# killed ones are kept and handed out again instead of building new ones.
+class SpritePool:
+    def __init__(self, sprite_class, max_size):
+        self.sprite_class = sprite_class
+        self.max_size = max_size # Extra released sprites are left to the GC
+        self.free = []
+        self.hits = 0   # acquire() served from the pool
+        self.misses = 0 # acquire() had to build a new sprite
+
+    def acquire(self, x, y):
+        if self.free:
+            sprite = self.free.pop()
+            sprite.reset(x, y)
+            # Released and reacquired in one step: don't interpolate from its old life
+            previous_positions.pop(sprite, None)
+            self.hits += 1
+        else:
+            sprite = self.sprite_class(x, y)
+            self.misses += 1
+        return sprite
+
+    def release(self, sprite):
+        if len(self.free) < self.max_size:
+            self.free.append(sprite)
+
+projectile_pool = SpritePool(Projectile, max_size=64)
+explosion_pool = SpritePool(Explosion, max_size=32)
+
+# --- Array Entity Engine ---
+# Optional backend for projectiles and plain enemies: one NumPy array per
+# field instead of one Python object per entity, so moving, culling and
+# collision testing run over whole populations at once.
+ENTITY_BACKEND = "sprites" # "arrays": projectiles and non-boss enemies live in EntityArrays
+
+class EntityArrays:
+    """A population of entities stored as parallel NumPy arrays.
+
+    Live entities are packed at the front of the arrays. `kind` indexes
+    `images`, which also gives each entity its size. For projectiles
+    `health` holds the damage they deal.
+    """
+    FIELDS = {"x": np.float32, "y": np.float32, "vx": np.float32, "vy": np.float32,
+              "health": np.int32, "max_health": np.int32, "kind": np.int16}
+
+    def __init__(self, images, capacity=256):
+        self.images = images
+        self.sizes = np.array([image.get_size() for image in images], dtype=np.int32)
+        self.count = 0
+        for name, dtype in self.FIELDS.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+
+    def __len__(self):
+        return self.count
+
+    def _reserve(self, extra):
+        capacity = len(self.x)
+        if self.count + extra <= capacity:
+            return
+        while capacity < self.count + extra:
+            capacity *= 2
+        for name in self.FIELDS:
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def spawn(self, kind, x, y, vx, vy, health):
+        self.spawn_many(kind, [x], [y], vx, vy, health)
+
+    def spawn_many(self, kind, xs, ys, vx, vy, health):
+        # Adds len(xs) entities of one kind; vx, vy and health may be scalars or arrays
+        n = len(xs)
+        self._reserve(n)
+        live = slice(self.count, self.count + n)
+        self.x[live] = xs
+        self.y[live] = ys
+        self.vx[live] = vx
+        self.vy[live] = vy
+        self.health[live] = health
+        self.max_health[live] = health
+        self.kind[live] = kind
+        self.count += n
+
+    def clear(self):
+        self.count = 0
+
+    def snapshot(self):
+        # The live entities as plain lists, one per field
+        return {name: getattr(self, name)[:self.count].tolist() for name in self.FIELDS}
+
+    def restore(self, state):
+        count = len(state["x"])
+        self.count = 0
+        self._reserve(count)
+        for name in self.FIELDS:
+            getattr(self, name)[:count] = state[name]
+        self.count = count
+
+    def keep(self, mask):
+        # Drops every live entity where mask is False
+        kept = int(np.count_nonzero(mask))
+        if kept == self.count:
+            return
+        for name in self.FIELDS:
+            values = getattr(self, name)
+            values[:kept] = values[:self.count][mask]
+        self.count = kept
+
+    def move(self):
+        n = self.count
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+
+    def boxes(self):
+        # (left, top, right, bottom) arrays of the live entities
+        n = self.count
+        sizes = self.sizes[self.kind[:n]]
+        left = self.x[:n]
+        top = self.y[:n]
+        return left, top, left + sizes[:, 0], top + sizes[:, 1]
+
+    def cull(self, left_limit=-np.inf, right_limit=np.inf):
+        # Drops entities whose right edge is left of left_limit or whose left edge is past right_limit
+        left, _, right, _ = self.boxes()
+        self.keep((right >= left_limit) & (left <= right_limit))
+
+    def draw(self, surf, alpha=1.0):
+        # Batch blit, positions interpolated back along the velocity like sprites are
+        n = self.count
+        back = 1.0 - alpha
+        xs = np.rint(self.x[:n] - self.vx[:n] * back).astype(np.int32).tolist()
+        ys = np.rint(self.y[:n] - self.vy[:n] * back).astype(np.int32).tolist()
+        images = self.images
+        return surf.blits([(images[kind], (x, y)) for kind, x, y in zip(self.kind[:n].tolist(), xs, ys)])
+
+def _grid_cells(boxes, cell_size):
+    # One (cell key, box index) row for every grid cell each box touches
+    left, top, right, bottom = boxes
+    cx0 = np.floor_divide(left, cell_size).astype(np.int64)
+    cy0 = np.floor_divide(top, cell_size).astype(np.int64)
+    # Right and bottom edges are exclusive
+    nx = np.ceil(right / cell_size).astype(np.int64) - cx0
+    ny = np.ceil(bottom / cell_size).astype(np.int64) - cy0
+    counts = np.maximum(nx, 0) * np.maximum(ny, 0)
+    index = np.repeat(np.arange(len(left)), counts)
+    # Position of each row within its own box's run of cells
+    local = np.arange(len(index)) - np.repeat(np.cumsum(counts) - counts, counts)
+    cx = cx0[index] + local % nx[index]
+    cy = cy0[index] + local // nx[index]
+    return (cx << 32) + cy, index
+
+def box_overlaps(boxes_a, boxes_b, cell_size=64):
+    """Indices (i, j) of every overlapping pair of box i from boxes_a and box j from boxes_b.
+
+    Both sides are bucketed into a uniform grid with NumPy, so only boxes
+    that share a cell are compared.
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    if len(boxes_a[0]) == 0 or len(boxes_b[0]) == 0:
+        return empty, empty
+    keys_a, index_a = _grid_cells(boxes_a, cell_size)
+    keys_b, index_b = _grid_cells(boxes_b, cell_size)
+    order = np.argsort(keys_b, kind="stable")
+    keys_b = keys_b[order]
+    index_b = index_b[order]
+    start = np.searchsorted(keys_b, keys_a, side="left")
+    counts = np.searchsorted(keys_b, keys_a, side="right") - start
+    i = np.repeat(index_a, counts)
+    cell = np.repeat(keys_a, counts)
+    offsets = np.arange(len(i)) - np.repeat(np.cumsum(counts) - counts, counts)
+    j = index_b[np.repeat(start, counts) + offsets]
+    # Exact test. A pair can share several cells, so it is only reported from
+    # the cell holding the top-left corner of the overlap.
+    left_a, top_a, right_a, bottom_a = boxes_a
+    left_b, top_b, right_b, bottom_b = boxes_b
+    corner_x = np.floor_divide(np.maximum(left_a[i], left_b[j]), cell_size).astype(np.int64)
+    corner_y = np.floor_divide(np.maximum(top_a[i], top_b[j]), cell_size).astype(np.int64)
+    hit = ((left_a[i] < right_b[j]) & (left_b[j] < right_a[i])
+           & (top_a[i] < bottom_b[j]) & (top_b[j] < bottom_a[i])
+           & (cell == (corner_x << 32) + corner_y))
+    return i[hit], j[hit]
+
+ARRAY_ENEMY_KINDS = list(ENEMY_TYPES) # enemy_arrays kind index -> enemy type
+projectile_arrays = None # Created by create_entity_arrays()
+enemy_arrays = None
+
+def create_entity_arrays():
+    global projectile_arrays, enemy_arrays
+    projectile_arrays = EntityArrays([get_image("projectile")])
+    enemy_arrays = EntityArrays([get_image("enemy_" + enemy_type) for enemy_type in ARRAY_ENEMY_KINDS])
+
+def fire_projectile(x, y):
+    # x, y is the centre of the new projectile
+    if ENTITY_BACKEND == "arrays":
+        width, height = projectile_arrays.sizes[0].tolist()
+        projectile_arrays.spawn(0, x - width // 2, y - height // 2, vx=12, vy=0, health=20)
+        return
+    projectile = projectile_pool.acquire(x, y)
+    all_sprites.add(projectile)
+    projectiles.add(projectile)
+
 # --- Sprite Groups ---
+class TypedGroup(pygame.sprite.Group):
+    """A sprite group that also indexes its sprites by a type attribute.
+
+    The index is kept up to date as sprites are added and killed, so
+    questions like "is a boss alive?" are a dict lookup, not a scan.
+    """
+    def __init__(self, type_attribute):
+        super().__init__()
+        self.type_attribute = type_attribute
+        self.by_type = collections.defaultdict(dict) # type -> {sprite: None}, in spawn order
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.by_type[getattr(sprite, self.type_attribute)][sprite] = None
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        del self.by_type[getattr(sprite, self.type_attribute)][sprite]
+
+    def count(self, sprite_type):
+        return len(self.by_type.get(sprite_type, ()))
+
 all_sprites = pygame.sprite.Group()
-player = Player(100, 500)
-all_sprites.add(player)
+player = None # Created by init_game()
 projectiles = pygame.sprite.Group()
-enemies = pygame.sprite.Group()
-collectibles = pygame.sprite.Group()
+enemies = TypedGroup("enemy_type")
+collectibles = TypedGroup("type")
 explosions = pygame.sprite.Group()
 
-# --- Background stars (simple) ---
-stars = []
-for i in range(50):
-    x = random.randint(0, screen_width)
-    y = random.randint(0, screen_height)
-    stars.append([x, y])
+# --- Background stars ---
+# Each parallax layer is drawn once into a surface twice the screen width
+# (the star pattern side by side with itself) and scrolled with one blit.
+STAR_LAYERS = [(50, 1)] # (number of stars, speed in pixels per step), back to front
+
+class StarLayer:
+    def __init__(self, count, speed, opaque):
+        self.speed = speed
+        self.offset = 0
+        # Seeded from random so the starfield follows random.seed()
+        rng = np.random.default_rng(random.getrandbits(32))
+        self.xs = rng.integers(0, screen_width, count)
+        self.ys = rng.integers(0, screen_height + 1, count)
+        self.surface = pygame.Surface((screen_width * 2, screen_height))
+        if not opaque:
+            self.surface.set_colorkey(BLACK) # Let the layers behind show through
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert()
+        for x, y in zip(self.xs.tolist(), self.ys.tolist()):
+            self._draw_star(x, y, WHITE)
+
+    def _draw_star(self, x, y, color):
+        pygame.draw.circle(self.surface, color, (x, y), 1)
+        pygame.draw.circle(self.surface, color, (x + screen_width, y), 1)
+
+    def update(self):
+        if self.speed == 0:
+            return
+        old_offset = self.offset
+        self.offset = (self.offset + self.speed) % screen_width
+        # Stars that just left the screen on the left come back on the right
+        # at a new height, like the old per-star version did
+        if self.offset > old_offset:
+            wrapped = (self.xs >= old_offset) & (self.xs < self.offset)
+        else:
+            wrapped = (self.xs >= old_offset) | (self.xs < self.offset)
+        for i in np.flatnonzero(wrapped).tolist():
+            x = int(self.xs[i])
+            self._draw_star(x, int(self.ys[i]), BLACK)
+            self.ys[i] = random.randint(0, screen_height)
+            self._draw_star(x, int(self.ys[i]), WHITE)
+
+    def snapshot(self):
+        return {"offset": self.offset, "xs": self.xs.tolist(), "ys": self.ys.tolist()}
+
+    def restore(self, state):
+        # Erases the current stars and draws the saved ones (cheaper than a full redraw)
+        for x, y in zip(self.xs.tolist(), self.ys.tolist()):
+            self._draw_star(x, y, BLACK)
+        self.offset = state["offset"]
+        self.xs = np.array(state["xs"], dtype=self.xs.dtype)
+        self.ys = np.array(state["ys"], dtype=self.ys.dtype)
+        for x, y in zip(self.xs.tolist(), self.ys.tolist()):
+            self._draw_star(x, y, WHITE)
+
+    def draw(self, surf):
+        return surf.blit(self.surface, (0, 0), (self.offset, 0, screen_width, screen_height))
+
+    def draw_stars(self, surf):
+        # Only the small areas around each star, for the dirty renderer
+        screen_xs = ((self.xs - self.offset) % screen_width).tolist()
+        blits = [(self.surface, (x - 1, y - 1), (x + self.offset - 1, y - 1, 3, 3))
+                 for x, y in zip(screen_xs, self.ys.tolist())]
+        return surf.blits(blits)
+
+star_layers = []
+
+def create_background():
+    global star_layers
+    star_layers = [StarLayer(count, speed, opaque=(i == 0))
+                   for i, (count, speed) in enumerate(STAR_LAYERS)]
 
 def update_background():
-    for star in stars:
-        star[0] -= 1 # Stars move left
-        if star[0] < 0:
-            star[0] = screen_width # Reset star to right side
-            star[1] = random.randint(0, screen_height)
+    for layer in star_layers:
+        layer.update()
 
 def draw_background():
-    for star in stars:
-        pygame.draw.circle(screen, WHITE, star, 1)
+    # Returns the rects drawn so the dirty renderer knows what changed
+    if DIRTY_RENDERING:
+        rects = []
+        for layer in star_layers:
+            rects += layer.draw_stars(screen)
+        return rects
+    # The first layer is opaque and covers the whole screen
+    return [layer.draw(screen) for layer in star_layers]
 
 # --- Level Data and State Variables ---
+game_over = False
+score = 0
+current_level = 1
+sim_step = 0 # Simulation steps since the game was (re)started
+damage_taken = 0 # Player health lost since the game was (re)started
+
+# Levels are read from a JSON file. Each spawn names an enemy or collectible
+# type and the step (since the level started) at which it reaches the right
+# edge of the screen. "count" and "every" repeat a spawn, "x" and "y"
+# override the position; y is random in the safe range when left out.
+LEVELS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels.json")
+levels = [] # Loaded by init_game()
+
+# Define a safe Y-range for enemy spawning
+min_enemy_y = 200 
+max_enemy_y = screen_height - 50 
+
+def load_levels(path):
+    with open(path) as levels_file:
+        return json.load(levels_file)["levels"]
+
+def spawn_entity(spawn):
+    x = spawn.get("x", screen_width)
+    y = spawn.get("y")
+    if y is None:
+        y = random.randint(min_enemy_y, max_enemy_y)
+    if "enemy" in spawn:
+        if spawn["enemy"] == "boss":
+            enemy = Boss(x, y)
+            event_log.info("spawn", "BOSS SPAWNED!")
+        elif ENTITY_BACKEND == "arrays":
+            stats = ENEMY_TYPES[spawn["enemy"]]
+            enemy_arrays.spawn(ARRAY_ENEMY_KINDS.index(spawn["enemy"]), x, y,
+                               vx=stats["speed_x"], vy=0, health=stats["health"])
+            return
+        else:
+            enemy = Enemy(x, y, spawn["enemy"])
+            event_log.debug("spawn", "Spawned %s enemy at (%d, %d)", enemy.enemy_type, enemy.rect.x, enemy.rect.y)
+        all_sprites.add(enemy)
+        enemies.add(enemy)
+    else:
+        collectible = Collectible(x, y, spawn["collectible"])
+        all_sprites.add(collectible)
+        collectibles.add(collectible)
+
+class LevelSpawner:
+    """Creates a level's enemies and collectibles just before they scroll into view.
+
+    Nothing exists (or gets updated and collision tested) until its step
+    comes up, so a level can schedule thousands of enemies.
+    """
+    def __init__(self):
+        self.schedule = [] # (step, spawn) sorted by step
+        self.next = 0
+        self.step = 0
+        self.pending_enemies = 0
+
+    def start(self, spawns):
+        self.schedule = []
+        for spawn in spawns:
+            for i in range(spawn.get("count", 1)):
+                self.schedule.append((spawn["step"] + i * spawn.get("every", 0), spawn))
+        self.schedule.sort(key=lambda entry: entry[0])
+        self.next = 0
+        self.step = 0
+        self.pending_enemies = sum(1 for _, spawn in self.schedule if "enemy" in spawn)
+
+    def update(self):
+        # Spawns everything due by the current step, then moves on one step
+        while self.next < len(self.schedule) and self.schedule[self.next][0] <= self.step:
+            spawn = self.schedule[self.next][1]
+            spawn_entity(spawn)
+            if "enemy" in spawn:
+                self.pending_enemies -= 1
+            self.next += 1
+        self.step += 1
+
+spawner = LevelSpawner()
+
 def load_level(level_number):
-    global player
+    global level_checkpoint
     # Clear existing enemies and collectibles
     for sprite in enemies:
         sprite.kill()
     for sprite in collectibles:
         sprite.kill()
-    
-    # Define a safe Y-range for enemy spawning
-    min_enemy_y = 200 
-    max_enemy_y = screen_height - 50 
-
-    print(f"Loading Level {level_number}...") # Debugging
-    if level_number == 1:
-        # Level 1: Basic enemies
-        for i in range(4):
-            enemy = Enemy(screen_width + i * 200, random.randint(min_enemy_y, max_enemy_y), "normal")
-            all_sprites.add(enemy)
-            enemies.add(enemy)
-            print(f"Spawned normal enemy at ({enemy.rect.x}, {enemy.rect.y})") # Debugging
-        
-        # Add some collectibles
-        health_pack = Collectible(screen_width + 500, random.randint(min_enemy_y, max_enemy_y), "health")
-        all_sprites.add(health_pack)
-        collectibles.add(health_pack)
-        
-        weapon_up = Collectible(screen_width + 900, random.randint(min_enemy_y, max_enemy_y), "weapon_upgrade")
-        all_sprites.add(weapon_up)
-        collectibles.add(weapon_up)
-        
-    elif level_number == 2:
-        # Level 2: Mixed enemies
-        for i in range(3):
-            enemy = Enemy(screen_width + i * 250, random.randint(min_enemy_y, max_enemy_y), "normal")
-            all_sprites.add(enemy)
-            enemies.add(enemy)
-            print(f"Spawned normal enemy at ({enemy.rect.x}, {enemy.rect.y})") # Debugging
-        
-        for i in range(2):
-            enemy = Enemy(screen_width + 1200 + i * 300, random.randint(min_enemy_y, max_enemy_y), "fast")
-            all_sprites.add(enemy)
-            enemies.add(enemy)
-            print(f"Spawned fast enemy at ({enemy.rect.x}, {enemy.rect.y})") # Debugging
-        
-        collectible = Collectible(screen_width + 1100, random.randint(min_enemy_y, max_enemy_y), "extra_life")
-        all_sprites.add(collectible)
-        collectibles.add(collectible)
-        
-    elif level_number == 3:
-        # Level 3: Boss Fight - spawn boss immediately
-        boss = Boss(screen_width - 100, screen_height // 2 - 40) # Spawn boss on screen
-        all_sprites.add(boss)
-        enemies.add(boss)
-        print("BOSS SPAWNED!")
-        
-        # Add collectibles for boss fight
-        health_pack = Collectible(screen_width + 200, random.randint(min_enemy_y, max_enemy_y), "health")
-        all_sprites.add(health_pack)
-        collectibles.add(health_pack)
-        
-        weapon_up = Collectible(screen_width + 400, random.randint(min_enemy_y, max_enemy_y), "weapon_upgrade")
-        all_sprites.add(weapon_up)
-        collectibles.add(weapon_up)
-        
-    print(f"Number of enemies after loading level {level_number}: {len(enemies)}") # Debugging
+    enemy_arrays.clear()
+
+    event_log.info("level", "Loading Level %d...", level_number)
+    spawner.start(levels[level_number - 1]["spawns"])
+    spawner.update() # Whatever is due at step 0 appears right away
+    event_log.debug("level", "Level %d: %d spawns scheduled", level_number, len(spawner.schedule))
+    level_checkpoint = take_snapshot() # Restarting the level goes back to here
+
+# --- Spatial Hash (collision broad phase) ---
+class SpatialHash:
+    """Uniform grid of sprites so a rect query only looks at nearby sprites."""
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def _cell_range(self, rect):
+        size = self.cell_size
+        return (rect.left // size, (rect.right - 1) // size,
+                rect.top // size, (rect.bottom - 1) // size)
+
+    def insert(self, sprite):
+        x0, x1, y0, y1 = self._cell_range(sprite.rect)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                self.cells.setdefault((cx, cy), []).append(sprite)
+
+    def rebuild(self, group):
+        # Rebuilt once per frame - cheaper than moving every sprite between cells
+        self.cells.clear()
+        for sprite in group:
+            self.insert(sprite)
+
+    def query(self, rect):
+        # Returns the live sprites overlapping rect, each one only once
+        found = {}
+        x0, x1, y0, y1 = self._cell_range(rect)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for sprite in self.cells.get((cx, cy), ()):
+                    if sprite not in found and sprite.alive() and sprite.rect.colliderect(rect):
+                        found[sprite] = None
+        return list(found)
+
+enemy_grid = SpatialHash()
+collectible_grid = SpatialHash()
 
 # --- Collision Detection ---
 def check_collisions():
-    global score, current_level, game_over
+    global score, current_level, game_over, damage_taken
+
+    enemy_grid.rebuild(enemies)
+    collectible_grid.rebuild(collectibles)
 
     # Projectile hits enemy
     for projectile in projectiles:
-        enemies_hit = pygame.sprite.spritecollide(projectile, enemies, False)
+        enemies_hit = enemy_grid.query(projectile.rect)
         for enemy in enemies_hit:
             enemy.health -= projectile.damage
             projectile.kill()
             
             # Create explosion effect
-            explosion = Explosion(enemy.rect.centerx, enemy.rect.centery)
+            explosion = explosion_pool.acquire(enemy.rect.centerx, enemy.rect.centery)
             all_sprites.add(explosion)
             explosions.add(explosion)
             
-            # print(f"Enemy hit! Health: {enemy.health}") # Debugging line
+            event_log.debug("damage", "Enemy %s hit! Health: %d", enemy.enemy_type, enemy.health)
             if enemy.health <= 0:
-                print(f"Enemy {enemy.enemy_type} killed (health 0) at X: {enemy.rect.x}") # Debugging
+                event_log.info("kill", "Enemy %s killed (health 0) at X: %d", enemy.enemy_type, enemy.rect.x)
                 enemy.kill()
-                if isinstance(enemy, Boss):
+                if enemy.enemy_type == "boss":
                     score += 500  # Boss gives more points
-                    print("BOSS DEFEATED!")
+                    event_log.info("kill", "BOSS DEFEATED!")
                     # Set game_over to True when the boss is defeated
                     global game_over 
                     game_over = True 
                 else:
                     score += 20
 
+    if ENTITY_BACKEND == "arrays":
+        check_array_collisions()
+
     # Player hits enemy
     # Using False for dokill so player isn't instantly removed on first hit
-    player_hit_enemies = pygame.sprite.spritecollide(player, enemies, False) 
-    if player_hit_enemies:
+    player_hit_enemies = enemy_grid.query(player.rect)
+    if player_hit_enemies or (ENTITY_BACKEND == "arrays" and player_touches_array_enemy()):
         # Take damage only once per collision instance, or on contact
         player.health -= 15 # Reduced damage slightly for more forgiving gameplay
-        # print(f"Player Health: {player.health}") # Debugging line
+        damage_taken += 15
+        event_log.info("damage", "Player Health: %d", player.health)
         if player.health <= 0:
             player.lives -= 1
             player.health = 100 # Reset health for next life
-            # print(f"Player Lives: {player.lives}") # Debugging line
+            event_log.info("damage", "Player Lives: %d", player.lives)
             if player.lives <= 0:
-                # print("Game Over") # Debugging line
+                event_log.info("level", "Game Over")
                 game_over = True
         # Push player back slightly to avoid continuous damage
         player.rect.x -= 20 
         if player.rect.left < 0: player.rect.left = 0 # Ensure player doesn't go off screen
 
     # Player hits collectible
-    collectible_hit = pygame.sprite.spritecollideany(player, collectibles)
-    if collectible_hit:
+    collectibles_hit = collectible_grid.query(player.rect)
+    if collectibles_hit:
+        collectible_hit = collectibles_hit[0]
         collectible_hit.kill()
         if collectible_hit.type == "health":
             player.health += 30
             if player.health > 100:
                 player.health = 100
-            # print("Health collected!") # Debugging line
+            event_log.info("pickup", "Health collected!")
         elif collectible_hit.type == "weapon_upgrade":
             if player.weapon_level < 3:
                 player.weapon_level += 1
-                # print(f"Weapon upgraded to level {player.weapon_level}!") # Debugging line
+                event_log.info("pickup", "Weapon upgraded to level %d!", player.weapon_level)
         elif collectible_hit.type == "extra_life":
             player.lives += 1
-            # print("Extra life collected!") # Debugging line
+            event_log.info("pickup", "Extra life collected!")
         elif collectible_hit.type == "score_boost":
             score += 100
-            # print("Score boost collected!") # Debugging line
+            event_log.info("pickup", "Score boost collected!")
+
+def _rect_box(rect):
+    return (np.array([rect.left]), np.array([rect.top]), np.array([rect.right]), np.array([rect.bottom]))
+
+def check_array_collisions():
+    # The same rules as the sprite version, applied to whole arrays at once
+    global score, game_over
+    if not len(projectile_arrays):
+        return
+    bullet_boxes = projectile_arrays.boxes()
+    bullets_used = np.zeros(projectile_arrays.count, dtype=bool)
+
+    # Projectiles hit plain enemies
+    bullet_index, enemy_index = box_overlaps(bullet_boxes, enemy_arrays.boxes())
+    if len(bullet_index):
+        bullets_used[bullet_index] = True
+        damage = np.bincount(enemy_index, weights=projectile_arrays.health[bullet_index],
+                             minlength=enemy_arrays.count)
+        enemy_arrays.health[:enemy_arrays.count] -= damage.astype(np.int32)
+        # One explosion per enemy hit this step
+        left, top, right, bottom = enemy_arrays.boxes()
+        for i in np.unique(enemy_index).tolist():
+            explosion = explosion_pool.acquire(int((left[i] + right[i]) // 2), int((top[i] + bottom[i]) // 2))
+            all_sprites.add(explosion)
+            explosions.add(explosion)
+        dead = enemy_arrays.health[:enemy_arrays.count] <= 0
+        kills = int(np.count_nonzero(dead))
+        if kills:
+            score += 20 * kills
+            event_log.info("kill", "%d enemies killed (health 0)", kills)
+            enemy_arrays.keep(~dead)
+
+    # Projectiles hit sprite enemies (the boss)
+    for enemy in enemies:
+        bullet_index, _ = box_overlaps(bullet_boxes, _rect_box(enemy.rect))
+        bullet_index = bullet_index[~bullets_used[bullet_index]]
+        if not len(bullet_index):
+            continue
+        bullets_used[bullet_index] = True
+        enemy.health -= int(projectile_arrays.health[bullet_index].sum())
+        explosion = explosion_pool.acquire(enemy.rect.centerx, enemy.rect.centery)
+        all_sprites.add(explosion)
+        explosions.add(explosion)
+        if enemy.health <= 0:
+            event_log.info("kill", "Enemy %s killed (health 0) at X: %d", enemy.enemy_type, enemy.rect.x)
+            enemy.kill()
+            if enemy.enemy_type == "boss":
+                score += 500  # Boss gives more points
+                event_log.info("kill", "BOSS DEFEATED!")
+                game_over = True
+            else:
+                score += 20
+
+    projectile_arrays.keep(~bullets_used)
+
+def player_touches_array_enemy():
+    player_index, _ = box_overlaps(_rect_box(player.rect), enemy_arrays.boxes())
+    return len(player_index) > 0
 
 # --- Draw Functions ---
-font = pygame.font.Font(None, 36)
-small_font = pygame.font.Font(None, 24)
+FONT_SIZE = 36
+SMALL_FONT_SIZE = 24
+LARGE_FONT_SIZE = 72
+fonts = {} # Size -> font, created the first time text of that size is drawn
+
+def get_font(size):
+    text_font = fonts.get(size)
+    if text_font is None:
+        text_font = pygame.font.Font(None, size)
+        fonts[size] = text_font
+    return text_font
+
+class HudText:
+    """One line of HUD text, only re-rendered when its value changes."""
+    def __init__(self, text_font, text, color, **position):
+        self.font = text_font
+        self.text = text # Format string for the value
+        self.color = color
+        self.position = position # e.g. topleft=(10, 10)
+        self.value = None
+        self.image = None
+        self.rect = None
+
+    def set_value(self, value):
+        # Returns True if the line had to be re-rendered
+        if self.image is not None and value == self.value:
+            return False
+        self.value = value
+        self.image = self.font.render(self.text.format(value), True, self.color)
+        self.rect = self.image.get_rect(**self.position)
+        return True
+
+class Hud:
+    """Composes the HUD lines onto one cached surface that is blitted once per frame."""
+    def __init__(self):
+        self.lines = {
+            "score": HudText(get_font(FONT_SIZE), "Score: {}", WHITE, topleft=(10, 10)),
+            "health": HudText(get_font(FONT_SIZE), "Health: {}", WHITE, topleft=(10, 40)),
+            "lives": HudText(get_font(FONT_SIZE), "Lives: {}", WHITE, topleft=(10, 70)),
+            "level": HudText(get_font(FONT_SIZE), "Level: {}", WHITE, topleft=(10, 100)),
+            # Show weapon level
+            "weapon_level": HudText(get_font(SMALL_FONT_SIZE), "Weapon Level: {}", YELLOW, topleft=(10, 130)),
+        }
+        # Show boss warning
+        self.boss_banner = HudText(get_font(FONT_SIZE), "BOSS BATTLE!", RED, center=(screen_width // 2, 50))
+        self.show_boss_banner = False
+        self.surface = None
+        self.rects = []
+
+    def draw(self, surf, show_boss_banner, **values):
+        # Returns the rects of the visible lines
+        changed = self.surface is None or show_boss_banner != self.show_boss_banner
+        for name, value in values.items():
+            if self.lines[name].set_value(value):
+                changed = True
+        if changed:
+            self._compose(show_boss_banner)
+        surf.blit(self.surface, (0, 0))
+        return list(self.rects)
+
+    def _compose(self, show_boss_banner):
+        self.show_boss_banner = show_boss_banner
+        lines = list(self.lines.values())
+        if show_boss_banner:
+            self.boss_banner.set_value(None)
+            lines.append(self.boss_banner)
+        self.rects = [line.rect for line in lines]
+        if self.surface is None:
+            height = max(rect.bottom for rect in self.rects) + 10
+            self.surface = pygame.Surface((screen_width, height), pygame.SRCALPHA)
+            if pygame.display.get_surface() is not None:
+                self.surface = self.surface.convert_alpha()
+        self.surface.fill((0, 0, 0, 0))
+        self.surface.blits([(line.image, line.rect) for line in lines], doreturn=False)
+
+hud = None # Created with the first frame that shows it
 
 def draw_hud():
-    # Basic HUD
-    score_text = font.render(f"Score: {score}", True, WHITE)
-    screen.blit(score_text, (10, 10))
-    
-    health_text = font.render(f"Health: {player.health}", True, WHITE)
-    screen.blit(health_text, (10, 40))
-    
-    lives_text = font.render(f"Lives: {player.lives}", True, WHITE)
-    screen.blit(lives_text, (10, 70))
-    
-    level_text = font.render(f"Level: {current_level}", True, WHITE)
-    screen.blit(level_text, (10, 100))
-    
-    # Show weapon level
-    weapon_text = small_font.render(f"Weapon Level: {player.weapon_level}", True, YELLOW)
-    screen.blit(weapon_text, (10, 130))
-    
-    # Show boss warning
-    if current_level == 3 and len(enemies) > 0 and any(isinstance(e, Boss) for e in enemies):
-        boss_text = font.render("BOSS BATTLE!", True, RED)
-        boss_rect = boss_text.get_rect(center=(screen_width // 2, 50))
-        screen.blit(boss_text, boss_rect)
-
-def draw_enemy_health(surf, x, y, health, max_health):
-    if health < max_health:  # Only show if damaged
-        BAR_LENGTH = 40
-        BAR_HEIGHT = 6
-        fill = (health / max_health) * BAR_LENGTH
-        outline_rect = pygame.Rect(x, y, BAR_LENGTH, BAR_HEIGHT)
-        fill_rect = pygame.Rect(x, y, fill, BAR_HEIGHT)
-        pygame.draw.rect(surf, RED, fill_rect)
-        pygame.draw.rect(surf, WHITE, outline_rect, 1)
-
-def draw_all_healths():
+    # Basic HUD, returns the rects drawn
+    global hud
+    if hud is None:
+        hud = Hud()
+    return hud.draw(screen,
+                    show_boss_banner=enemies.count("boss") > 0,
+                    score=score,
+                    health=player.health,
+                    lives=player.lives,
+                    level=current_level,
+                    weapon_level=player.weapon_level)
+
+HEALTH_BAR_LENGTH = 40
+HEALTH_BAR_HEIGHT = 6
+health_bar_images = {} # Filled width in pixels -> bar image
+
+def get_health_bar(fill):
+    # Bars only differ by their filled width, so there are at most 41 of them
+    image = health_bar_images.get(fill)
+    if image is None:
+        image = pygame.Surface((HEALTH_BAR_LENGTH, HEALTH_BAR_HEIGHT))
+        image.set_colorkey(BLACK) # The empty part shows what is behind the bar
+        pygame.draw.rect(image, RED, (0, 0, fill, HEALTH_BAR_HEIGHT))
+        pygame.draw.rect(image, WHITE, (0, 0, HEALTH_BAR_LENGTH, HEALTH_BAR_HEIGHT), 1)
+        if pygame.display.get_surface() is not None:
+            image = image.convert()
+        health_bar_images[fill] = image
+    return image
+
+def health_bar_fill(health, max_health):
+    return min(max(int((health / max_health) * HEALTH_BAR_LENGTH), 0), HEALTH_BAR_LENGTH)
+
+def draw_all_healths(alpha=1.0):
+    # All bars go to the screen in one blits() call
+    bars = []
     for sprite in enemies:
-        draw_enemy_health(screen, sprite.rect.x, sprite.rect.y - 10, 
-                         sprite.health, sprite.max_health)
+        if sprite.health < sprite.max_health:  # Only show if damaged
+            x, y = interpolated_topleft(sprite, alpha)
+            bars.append((get_health_bar(health_bar_fill(sprite.health, sprite.max_health)), (x, y - 10)))
+    if ENTITY_BACKEND == "arrays":
+        n = enemy_arrays.count
+        damaged = np.flatnonzero(enemy_arrays.health[:n] < enemy_arrays.max_health[:n])
+        if len(damaged):
+            back = 1.0 - alpha
+            fills = np.clip(enemy_arrays.health[damaged] * HEALTH_BAR_LENGTH // enemy_arrays.max_health[damaged],
+                            0, HEALTH_BAR_LENGTH).tolist()
+            xs = np.rint(enemy_arrays.x[damaged] - enemy_arrays.vx[damaged] * back).astype(np.int32).tolist()
+            ys = np.rint(enemy_arrays.y[damaged] - enemy_arrays.vy[damaged] * back).astype(np.int32).tolist()
+            bars += [(get_health_bar(fill), (x, y - 10)) for fill, x, y in zip(fills, xs, ys)]
+    return screen.blits(bars)
 
 # --- Game Over Screen ---
 def show_game_over_screen():
     screen.fill(BLACK)
-    font_large = pygame.font.Font(None, 72)
-    text_game_over = font_large.render("GAME OVER", True, RED)
+    text_game_over = get_font(LARGE_FONT_SIZE).render("GAME OVER", True, RED)
     text_rect = text_game_over.get_rect(center=(screen_width // 2, screen_height // 3))
     screen.blit(text_game_over, text_rect)
 
-    final_score_text = font.render(f"Final Score: {score}", True, WHITE)
+    final_score_text = get_font(FONT_SIZE).render(f"Final Score: {score}", True, WHITE)
     score_rect = final_score_text.get_rect(center=(screen_width // 2, screen_height // 2 - 30))
     screen.blit(final_score_text, score_rect)
 
-    text_restart = font.render("Press SPACE to Restart", True, WHITE)
+    text_restart = get_font(FONT_SIZE).render("Press SPACE to Restart", True, WHITE)
     restart_rect = text_restart.get_rect(center=(screen_width // 2, screen_height // 2 + 30))
     screen.blit(text_restart, restart_rect)
 
     pygame.display.flip()
 
-    waiting = True
-    while waiting:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                quit()
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    reset_game()
-                    waiting = False
+    # Nothing changes on this screen, so sleep until an event arrives
+    # instead of polling
+    while True:
+        event = pygame.event.wait()
+        if event.type == pygame.QUIT:
+            pygame.quit()
+            quit()
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+            reset_game()
+            return
+        if event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+            pygame.display.flip() # Window was uncovered
 
 # --- Reset Game Function ---
 def reset_game():
-    global score, current_level, game_over, player
+    global score, current_level, game_over, player, sim_step, damage_taken
     score = 0
     current_level = 1
     game_over = False
-    load_level(current_level)
+    sim_step = 0
+    damage_taken = 0
+    for sprite in projectiles:
+        sprite.kill()
+    for sprite in explosions:
+        sprite.kill()
+    projectile_arrays.clear()
     player.health = 100
     player.lives = 3
     player.weapon_level = 1  # Reset weapon level
     player.rect.topleft = (100, 500) # Reset player position
+    # Mid-jump or mid-cooldown state would otherwise carry into the new game
+    player.speed_x = 0
+    player.speed_y = 0
+    player.is_jumping = False
+    player.shoot_delay = 0
+    load_level(current_level) # After the player reset, so the level checkpoint has it
+    previous_positions.clear() # Nothing to interpolate from after a reset
 
-# --- Main Game Loop ---
-running = True
-game_over = False
-score = 0
-current_level = 1
-load_level(current_level)
+# --- Snapshots and Save Games ---
+# A snapshot is the whole game state as plain lists and dicts, so it can be
+# kept in memory for an instant restart or written out as JSON for a save
+# game. Restoring reuses the sprites that already exist wherever it can.
+SNAPSHOT_VERSION = 1
+SAVE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "savegame.json")
+PLAYER_FIELDS = ["speed_x", "speed_y", "health", "lives", "is_jumping", "weapon_level", "shoot_delay"]
+level_checkpoint = None # Snapshot taken when the current level started
 
-clock = pygame.time.Clock()
+def take_snapshot():
+    numpy_state = np.random.get_state()
+    return {
+        "version": SNAPSHOT_VERSION,
+        "score": score,
+        "current_level": current_level,
+        "game_over": game_over,
+        "sim_step": sim_step,
+        "damage_taken": damage_taken,
+        "player": [list(player.rect.topleft)] + [getattr(player, field) for field in PLAYER_FIELDS],
+        # Enemy rows: type, left, top, health, max health, speed x, vertical speed (boss only)
+        "enemies": [[enemy.enemy_type, enemy.rect.x, enemy.rect.y, enemy.health, enemy.max_health,
+                     enemy.speed_x, getattr(enemy, "vertical_speed", 0)] for enemy in enemies],
+        "collectibles": [[collectible.type, *collectible.rect.center] for collectible in collectibles],
+        "projectiles": [list(projectile.rect.center) for projectile in projectiles],
+        "explosions": [[*explosion.rect.center, explosion.current_image, explosion.timer]
+                       for explosion in explosions],
+        "projectile_arrays": projectile_arrays.snapshot(),
+        "enemy_arrays": enemy_arrays.snapshot(),
+        "spawner": [spawner.next, spawner.step, spawner.pending_enemies],
+        "stars": [layer.snapshot() for layer in star_layers],
+        "random": [random.getstate()[0], list(random.getstate()[1]), random.getstate()[2]],
+        "numpy_random": [numpy_state[0], numpy_state[1].tolist(), *numpy_state[2:]],
+    }
 
-while running:
-    clock.tick(60)  # 60 FPS
-    
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-    if not game_over:
-        # --- Update ---
-        update_background()
-        all_sprites.update()
-
-        # --- Collision Detection ---
-        check_collisions()
-
-        # --- Level Progression ---
-        # Check if all enemies are defeated in the current level
-        if len(enemies) == 0:
-            if current_level < 3:
-                # For Level 1 and 2, advance to next level
-                current_level += 1
-                load_level(current_level)
-                print(f"Advancing to Level {current_level}") # Debugging line
-            elif current_level == 3:
-                # If it's Level 3 and all enemies (including the boss) are defeated, it's game over
-                print("Game Over: Boss defeated!")
-                game_over = True # Set game_over to True to trigger the game over screen
-                
-        # --- Draw ---
-        screen.fill(BLACK)
-        draw_background()
-        all_sprites.draw(screen)
-        draw_hud()
-        draw_all_healths()
-        pygame.display.flip()
+def _take_spares(group, type_attribute=None):
+    # Takes a group's sprites out of every group, so they can be put back in
+    # snapshot order (collisions are checked in group order). Returns them
+    # in pop() order, or a dict of such lists keyed by type_attribute.
+    spares = list(group)
+    for sprite in spares:
+        sprite.remove(*sprite.groups())
+    spares.reverse()
+    if type_attribute is None:
+        return spares
+    by_type = collections.defaultdict(list)
+    for sprite in spares:
+        by_type[getattr(sprite, type_attribute)].append(sprite)
+    return by_type
+
+def _reuse_or_create(spare, create):
+    # A spare sprite if there is one, otherwise a new one from create()
+    return spare.pop() if spare else create()
+
+SNAPSHOT_KEYS = ["score", "current_level", "game_over", "sim_step", "damage_taken", "player", "enemies",
+                 "collectibles", "projectiles", "explosions", "projectile_arrays", "enemy_arrays", "spawner",
+                 "stars", "random", "numpy_random"]
+# Row lengths of the list fields, as take_snapshot() writes them
+SNAPSHOT_ROWS = {"enemies": 7, "collectibles": 3, "projectiles": 2, "explosions": 4}
+
+def check_snapshot(state):
+    # Raises ValueError for a snapshot restore_snapshot() couldn't use, before
+    # anything in the game has been changed
+    if not isinstance(state, dict) or state.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"not a version {SNAPSHOT_VERSION} snapshot")
+    missing = [key for key in SNAPSHOT_KEYS if key not in state]
+    if missing:
+        raise ValueError("snapshot is missing " + ", ".join(missing))
+    if not 1 <= state["current_level"] <= len(levels):
+        raise ValueError(f"snapshot is on level {state['current_level']}, which doesn't exist")
+    if len(state["player"]) != 1 + len(PLAYER_FIELDS) or len(state["player"][0]) != 2:
+        raise ValueError("snapshot has a damaged player")
+    for key, length in SNAPSHOT_ROWS.items():
+        if any(len(row) != length for row in state[key]):
+            raise ValueError(f"snapshot has damaged {key}")
+    if any(row[0] not in ENEMY_TYPES and row[0] != "boss" for row in state["enemies"]):
+        raise ValueError("snapshot has an unknown enemy type")
+    if any("collectible_" + row[0] not in SPRITE_ART for row in state["collectibles"]):
+        raise ValueError("snapshot has an unknown collectible type")
+    if any(not 0 <= row[2] < len(EXPLOSION_SIZES) for row in state["explosions"]):
+        raise ValueError("snapshot has a damaged explosion")
+    if len(state["spawner"]) != 3 or len(state["stars"]) != len(star_layers):
+        raise ValueError("snapshot has a damaged spawner or starfield")
+    # Throwaway generators take the random states first, so bad ones fail here
+    version, internal_state, gauss = state["random"]
+    random.Random().setstate((version, tuple(internal_state), gauss))
+    name, keys, *rest = state["numpy_random"]
+    np.random.RandomState().set_state((name, np.array(keys, dtype=np.uint32), *rest))
+
+def restore_snapshot(state):
+    global score, current_level, game_over, sim_step, damage_taken
+    check_snapshot(state)
+    score = state["score"]
+    current_level = state["current_level"]
+    game_over = state["game_over"]
+    sim_step = state["sim_step"]
+    damage_taken = state["damage_taken"]
+
+    player.rect.topleft = state["player"][0]
+    for field, value in zip(PLAYER_FIELDS, state["player"][1:]):
+        setattr(player, field, value)
+
+    # Enemies of the right type are reused; only missing ones are built
+    spare_enemies = _take_spares(enemies, "enemy_type")
+    for enemy_type, x, y, health, max_health, speed_x, vertical_speed in state["enemies"]:
+        spare = spare_enemies[enemy_type]
+        if enemy_type == "boss":
+            enemy = _reuse_or_create(spare, lambda: Boss(x, y))
+            enemy.vertical_speed = vertical_speed
+        else:
+            enemy = _reuse_or_create(spare, lambda: Enemy(x, y, enemy_type))
+        enemy.rect.topleft = (x, y)
+        enemy.health = health
+        enemy.max_health = max_health
+        enemy.speed_x = speed_x
+        all_sprites.add(enemy)
+        enemies.add(enemy)
+    spare_collectibles = _take_spares(collectibles, "type")
+    for kind, x, y in state["collectibles"]:
+        collectible = _reuse_or_create(spare_collectibles[kind], lambda: Collectible(x, y, kind))
+        collectible.rect.center = (x, y)
+        all_sprites.add(collectible)
+        collectibles.add(collectible)
+
+    # Missing projectiles and explosions come from their pools, and
+    # unused ones go back there
+    spare_projectiles = _take_spares(projectiles)
+    for x, y in state["projectiles"]:
+        projectile = _reuse_or_create(spare_projectiles, lambda: projectile_pool.acquire(x, y))
+        projectile.reset(x, y)
+        all_sprites.add(projectile)
+        projectiles.add(projectile)
+    spare_explosions = _take_spares(explosions)
+    for x, y, current_image, timer in state["explosions"]:
+        explosion = _reuse_or_create(spare_explosions, lambda: explosion_pool.acquire(x, y))
+        explosion.current_image = current_image
+        explosion.timer = timer
+        explosion.image = explosion.images[current_image]
+        explosion.rect = explosion.image.get_rect(center=(x, y))
+        all_sprites.add(explosion)
+        explosions.add(explosion)
+    for projectile in spare_projectiles:
+        projectile_pool.release(projectile)
+    for explosion in spare_explosions:
+        explosion_pool.release(explosion)
+
+    projectile_arrays.restore(state["projectile_arrays"])
+    enemy_arrays.restore(state["enemy_arrays"])
+    spawner.start(levels[current_level - 1]["spawns"])
+    spawner.next, spawner.step, spawner.pending_enemies = state["spawner"]
+    for layer, layer_state in zip(star_layers, state["stars"]):
+        layer.restore(layer_state)
+    version, internal_state, gauss = state["random"]
+    random.setstate((version, tuple(internal_state), gauss))
+    name, keys, *rest = state["numpy_random"]
+    np.random.set_state((name, np.array(keys, dtype=np.uint32), *rest))
+
+    previous_positions.clear()
+    dirty_renderer.full_redraw = True
+
+def restart_level():
+    # Back to the start of the current level, as it was when first reached
+    restore_snapshot(level_checkpoint)
+    event_log.info("level", "Restarted Level %d", current_level)
+
+def save_game(path=SAVE_FILE):
+    state = take_snapshot()
+    state["level_checkpoint"] = level_checkpoint # So R still restarts the saved level after loading
+    with open(path, "w") as save_file:
+        json.dump(state, save_file)
+    event_log.info("save", "Game saved to %s", path)
+
+def load_game(path=SAVE_FILE):
+    global level_checkpoint
+    current = take_snapshot()
+    try:
+        with open(path) as save_file:
+            state = json.load(save_file)
+        check_snapshot(state)
+        checkpoint = state.get("level_checkpoint") or state
+        # R restores the checkpoint later, so it has to restore cleanly now
+        restore_snapshot(checkpoint)
+        restore_snapshot(state)
+    except (OSError, ValueError, KeyError, IndexError, TypeError) as error:
+        # Unreadable, old or damaged save: put back anything already restored and play on
+        restore_snapshot(current)
+        event_log.warning("save", "Could not load %s: %s", path, error)
+        return
+    level_checkpoint = checkpoint
+    event_log.info("save", "Game loaded from %s", path)
+
+# --- Frame Profiler ---
+PROFILE_STAGES = ["update_background", "update_sprites", "check_collisions", "level_progression",
+                  "draw_background", "draw_sprites", "draw_hud", "draw_all_healths", "display"]
+
+class FrameProfiler:
+    """Times each stage of a frame and keeps rolling per-stage statistics.
+
+    Call sites check `enabled` themselves so a disabled profiler costs one
+    attribute lookup per stage.
+    """
+    def __init__(self, window=120):
+        self.enabled = False
+        self.always_on = False # --profile: keep timing while the overlay is hidden
+        self.show_overlay = False
+        self.history = {stage: collections.deque(maxlen=window) for stage in PROFILE_STAGES}
+        self.current = dict.fromkeys(PROFILE_STAGES, 0.0)
+        self.frame = 0
+        self.csv_file = None
+        self.csv_writer = None
+        self.overlay = None
+        self._last = 0.0
+
+    def start(self):
+        self._last = time.perf_counter()
+
+    def lap(self, stage):
+        # Charges the time since the last start()/lap() to stage
+        now = time.perf_counter()
+        self.current[stage] += now - self._last
+        self._last = now
+
+    def end_frame(self):
+        for stage, seconds in self.current.items():
+            self.history[stage].append(seconds)
+        if self.csv_writer:
+            counts = sprite_group_counts()
+            if self.frame == 0:
+                # Header written with the first row, once every group exists
+                self.csv_writer.writerow(["frame"] + [f"{stage}_ms" for stage in PROFILE_STAGES]
+                                         + [f"{name}_count" for name in counts])
+            self.csv_writer.writerow([self.frame]
+                                     + [f"{self.current[stage] * 1000:.4f}" for stage in PROFILE_STAGES]
+                                     + list(counts.values()))
+        self.current = dict.fromkeys(PROFILE_STAGES, 0.0)
+        self.frame += 1
+        if self.show_overlay and self.frame % 15 == 0:
+            self.overlay = None # Refresh the overlay text four times a second
+
+    def reset(self):
+        for samples in self.history.values():
+            samples.clear()
+
+    def averages(self):
+        # Mean milliseconds per stage over the rolling window
+        return {stage: (sum(samples) / len(samples) * 1000 if samples else 0.0)
+                for stage, samples in self.history.items()}
+
+    def open_csv(self, path):
+        self.enabled = True
+        self.csv_file = open(path, "w", newline="")
+        self.csv_writer = csv.writer(self.csv_file)
+
+    def close(self):
+        if self.csv_file:
+            self.csv_file.close()
+            self.csv_file = None
+            self.csv_writer = None
+
+    def toggle_overlay(self):
+        self.show_overlay = not self.show_overlay
+        self.enabled = self.always_on or self.show_overlay or self.csv_writer is not None
+        self.overlay = None
+        self.reset()
+
+    def draw_overlay(self, surf):
+        if self.overlay is None:
+            averages = self.averages()
+            rows = [(stage, f"{averages[stage]:.2f} ms") for stage in PROFILE_STAGES]
+            rows.append(("total", f"{sum(averages.values()):.2f} ms"))
+            rows += [(name, str(count)) for name, count in sprite_group_counts().items()]
+            small_font = get_font(SMALL_FONT_SIZE)
+            rows = [(small_font.render(label, True, GREEN), small_font.render(value, True, GREEN))
+                    for label, value in rows]
+            label_width = max(label.get_width() for label, _ in rows)
+            value_width = max(value.get_width() for _, value in rows)
+            line_height = small_font.get_linesize()
+            self.overlay = pygame.Surface((label_width + value_width + 25, line_height * len(rows) + 10))
+            self.overlay.set_alpha(200)
+            for i, (label, value) in enumerate(rows):
+                y = 5 + i * line_height
+                self.overlay.blit(label, (5, y))
+                self.overlay.blit(value, value.get_rect(topright=(self.overlay.get_width() - 5, y)))
+        return [surf.blit(self.overlay, self.overlay.get_rect(topright=(screen_width - 10, 10)))]
+
+def sprite_group_counts():
+    counts = {"all_sprites": len(all_sprites), "projectiles": len(projectiles), "enemies": len(enemies),
+              "collectibles": len(collectibles), "explosions": len(explosions),
+              "projectile_arrays": len(projectile_arrays), "enemy_arrays": len(enemy_arrays)}
+    for enemy_type in ENEMY_TYPES:
+        counts["enemies:" + enemy_type] = enemies.count(enemy_type)
+    counts["enemies:boss"] = enemies.count("boss")
+    return counts
+
+profiler = FrameProfiler()
+
+# --- Timing ---
+# The simulation always advances in fixed steps; speeds are in pixels per step.
+SIM_FPS = 60
+SIM_STEP = 1.0 / SIM_FPS
+RENDER_FPS = 60     # Render frame cap, 0 = uncapped
+IDLE_FPS = 20       # Frame cap while only the background is moving
+UNFOCUSED_FPS = 15  # Frame cap while the window doesn't have focus
+MAX_FRAME_SKIP = 5  # Most simulation steps run before a frame has to be drawn
+
+# Sprite positions before the latest step, used to interpolate rendering
+previous_positions = {}
+
+def update_game():
+    # Runs one fixed simulation step
+    global current_level, game_over, sim_step
+    previous_positions.clear()
+    for sprite in all_sprites:
+        previous_positions[sprite] = sprite.rect.topleft
+
+    profiling = profiler.enabled
+    if profiling:
+        profiler.start()
+
+    # --- Update ---
+    update_background()
+    if profiling:
+        profiler.lap("update_background")
+    spawner.update()
+    all_sprites.update()
+    if ENTITY_BACKEND == "arrays":
+        projectile_arrays.move()
+        projectile_arrays.cull(right_limit=screen_width)
+        enemy_arrays.move()
+        enemy_arrays.cull(left_limit=0)
+    if profiling:
+        profiler.lap("update_sprites")
+
+    # --- Collision Detection ---
+    check_collisions()
+    if profiling:
+        profiler.lap("check_collisions")
+
+    # --- Level Progression ---
+    # Check if all enemies are defeated (and none are still to come) in the current level
+    if len(enemies) == 0 and len(enemy_arrays) == 0 and spawner.pending_enemies == 0:
+        if current_level < len(levels):
+            # Advance to next level
+            current_level += 1
+            load_level(current_level)
+            event_log.info("level", "Advancing to Level %d", current_level)
+        else:
+            # If it's the last level and all enemies (including the boss) are defeated, it's game over
+            event_log.info("level", "Game Over: Boss defeated!")
+            game_over = True # Set game_over to True to trigger the game over screen
+    sim_step += 1
+    if profiling:
+        profiler.lap("level_progression")
+
+def interpolated_topleft(sprite, alpha):
+    # Where to draw a sprite alpha (0..1) of the way through the current step
+    previous = previous_positions.get(sprite)
+    if previous is None:
+        return sprite.rect.topleft # Spawned during the last step
+    x, y = sprite.rect.topleft
+    return (round(previous[0] + (x - previous[0]) * alpha),
+            round(previous[1] + (y - previous[1]) * alpha))
+
+# --- Rendering ---
+DIRTY_RENDERING = False # True: only clear and push the regions that changed
+
+def draw_sprites(alpha):
+    rects = screen.blits([(sprite.image, interpolated_topleft(sprite, alpha))
+                          for sprite in all_sprites])
+    if ENTITY_BACKEND == "arrays":
+        rects += enemy_arrays.draw(screen, alpha)
+        rects += projectile_arrays.draw(screen, alpha)
+    return rects
+
+class DirtyRenderer:
+    """Redraws the scene but only clears and updates the rects that changed."""
+    def __init__(self):
+        self.last_rects = []
+        self.full_redraw = True # Set after anything else has drawn over the screen
+
+    def draw(self, alpha):
+        if self.full_redraw:
+            screen.fill(BLACK)
+        else:
+            # Erase last frame's drawing; everything is drawn again below
+            for rect in self.last_rects:
+                screen.fill(BLACK, rect)
+        rects = draw_scene(alpha)
+        if self.full_redraw:
+            pygame.display.flip()
+            self.full_redraw = False
+        else:
+            # Old rects must be pushed too so erased sprites disappear on screen
+            pygame.display.update(self.last_rects + rects)
+        self.last_rects = rects
+
+dirty_renderer = DirtyRenderer()
+
+def draw_scene(alpha):
+    # Draws one frame and returns the rects it touched
+    profiling = profiler.enabled
+    rects = draw_background() # Opaque, so no screen.fill() is needed
+    if profiling:
+        profiler.lap("draw_background")
+    rects += draw_sprites(alpha)
+    if profiling:
+        profiler.lap("draw_sprites")
+    rects += draw_hud()
+    if profiling:
+        profiler.lap("draw_hud")
+    rects += draw_all_healths(alpha)
+    if profiling:
+        profiler.lap("draw_all_healths")
+        if profiler.show_overlay:
+            rects += profiler.draw_overlay(screen)
+    return rects
+
+def draw_game(alpha):
+    profiling = profiler.enabled
+    if profiling:
+        profiler.start()
+    if DIRTY_RENDERING:
+        dirty_renderer.draw(alpha)
     else:
-        show_game_over_screen()
+        draw_scene(alpha)
+        pygame.display.flip()
+    if profiling:
+        profiler.lap("display")
+        profiler.end_frame()
+
+# --- Startup ---
+class StartupReport:
+    """Wall time of each startup phase, from the first import to the first game frame."""
+    def __init__(self, start):
+        self.last = start
+        self.phases = []
+        self.enabled = False # Print the report after the first game frame
+        self.done = False
+
+    def mark(self, phase):
+        # Records the time since the previous mark as phase
+        if self.done:
+            return
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def finish(self):
+        if self.done:
+            return
+        self.mark("first game frame")
+        self.done = True
+        total = sum(seconds for _, seconds in self.phases)
+        event_log.info("startup", "Started in %.1f ms", total * 1000)
+        if self.enabled:
+            for phase, seconds in self.phases:
+                print(f"{phase:<20}{seconds * 1000:>9.1f} ms")
+            print(f"{'total':<20}{total * 1000:>9.1f} ms")
+
+startup = StartupReport(_startup_start)
+
+def init_game(levels_file=LEVELS_FILE):
+    # Only display and font are initialized (no audio or joystick). Fonts,
+    # sprite art and the HUD are created by the first frame that uses them.
+    global screen, player, levels
+    levels = load_levels(levels_file)
+    startup.mark("load levels")
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((screen_width, screen_height))
+    pygame.display.set_caption("Super Hero Adventure")
+    screen.fill(BLACK) # Something on screen while the rest is set up
+    pygame.display.flip()
+    startup.mark("open window")
+    create_background()
+    startup.mark("background")
+    create_entity_arrays()
+    player = Player(100, 500)
+    all_sprites.add(player)
+    startup.mark("entities")
+
+# --- Main Game Loop ---
+window_focused = True
+
+def scene_is_idle():
+    # True when nothing but the stars would change from one frame to the next
+    return (not projectiles and not explosions and not enemies and not collectibles
+            and not len(projectile_arrays) and not len(enemy_arrays)
+            and player.speed_x == 0 and not player.is_jumping)
+
+def frame_rate_cap():
+    # Lower frame rates still run every simulation step; they just draw
+    # (up to MAX_FRAME_SKIP) steps per frame, so CPU use follows activity
+    if not RENDER_FPS:
+        return 0
+    if not window_focused:
+        return min(RENDER_FPS, UNFOCUSED_FPS)
+    if scene_is_idle():
+        return min(RENDER_FPS, IDLE_FPS)
+    return RENDER_FPS
+
+def run_game(auto_restart=False, save_path=None):
+    # auto_restart skips the game over screen (used when replaying input);
+    # save_path starts from a save game instead of level 1
+    global window_focused
+    reset_game()
+    if save_path:
+        load_game(save_path)
+
+    clock = pygame.time.Clock()
+    accumulator = 0.0
+    last_time = time.perf_counter()
+    running = True
+
+    while running:
+        clock.tick(frame_rate_cap())
+        now = time.perf_counter()
+        accumulator += now - last_time
+        last_time = now
+        
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle_overlay() # F3 shows stage timings and sprite counts
+            elif event.type == pygame.KEYDOWN and key_source is live_keys:
+                # Not while recording or replaying - these aren't in the recording
+                if event.key == pygame.K_r:
+                    restart_level()
+                elif event.key == pygame.K_F5:
+                    save_game()
+                elif event.key == pygame.K_F9 and os.path.exists(SAVE_FILE):
+                    load_game()
+            elif event.type == pygame.WINDOWFOCUSLOST:
+                window_focused = False
+            elif event.type == pygame.WINDOWFOCUSGAINED:
+                window_focused = True
+            elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                dirty_renderer.full_redraw = True # Window was uncovered, so all of it is stale
+
+        if not game_over:
+            steps = 0
+            while accumulator >= SIM_STEP and steps < MAX_FRAME_SKIP and not game_over:
+                update_game()
+                accumulator -= SIM_STEP
+                steps += 1
+            if steps == MAX_FRAME_SKIP:
+                # Too far behind - drop the backlog so the game slows down instead of spiralling
+                accumulator = min(accumulator, SIM_STEP)
+
+            draw_game(min(accumulator / SIM_STEP, 1.0))
+            startup.finish()
+        elif auto_restart:
+            reset_game()
+        else:
+            show_game_over_screen()
+            dirty_renderer.full_redraw = True
+            # Don't try to catch up on the time spent on the game over screen
+            accumulator = 0.0
+            last_time = time.perf_counter()
+
+# --- Benchmark ---
+class HeldKeys(frozenset):
+    """Key state that can be indexed like pygame.key.get_pressed()."""
+    def __getitem__(self, key):
+        return key in self
+
+class ScriptedInput:
+    """Feeds a timeline of held keys to the player instead of the keyboard."""
+    def __init__(self, timeline, length):
+        # timeline: [(first step, last step, keys held)], expanded once up front
+        held = [set() for _ in range(length)]
+        for first, last, keys in timeline:
+            for step in range(max(first, 0), min(last + 1, length)):
+                held[step].update(keys)
+        self.held = [HeldKeys(keys) for keys in held]
+
+    def __call__(self):
+        if sim_step < len(self.held):
+            return self.held[sim_step]
+        return HeldKeys()
+
+def _every(period, length, keys, duration=1):
+    # Presses keys for duration steps once every period steps
+    return [(step, step + duration - 1, keys) for step in range(0, length, period)]
+
+def spawn_wave(count):
+    # A block of random enemies just off the right edge of the screen
+    for i in range(count):
+        spawn_entity({"enemy": random.choice(list(ENEMY_TYPES)), "x": screen_width + random.randint(0, 400)})
+
+def _setup_dense_waves():
+    reset_game()
+    player.lives = 999 # Keep the benchmark running
+
+def _step_dense_waves():
+    if sim_step % 120 == 1:
+        spawn_wave(40)
+
+def _setup_weapon_spam():
+    reset_game()
+    player.lives = 999
+    player.weapon_level = 3
+
+def _setup_boss_fight():
+    global current_level
+    reset_game()
+    player.lives = 999
+    player.weapon_level = 3
+    current_level = 3
+    load_level(current_level)
+
+def _setup_bullet_hell():
+    reset_game()
+    player.lives = 999
+    player.weapon_level = 3
+
+def _step_bullet_hell():
+    # About 10k live projectiles and a steady stream of tough enemies;
+    # needs the "arrays" entity backend
+    projectile_arrays.spawn_many(0, np.random.uniform(0, screen_width, 150),
+                                 np.random.uniform(0, screen_height, 150), vx=12, vy=0, health=20)
+    enemy_arrays.spawn_many(np.random.randint(len(ARRAY_ENEMY_KINDS)),
+                            np.full(4, screen_width), np.random.uniform(0, screen_height - 50, 4),
+                            vx=-2, vy=0, health=200)
+
+BENCHMARK_SCENARIOS = {
+    "dense_waves": {
+        "setup": _setup_dense_waves,
+        "step": _step_dense_waves,
+        "timeline": lambda length: ([(0, length, (pygame.K_LCTRL,))]
+                                    + _every(240, length, (pygame.K_RIGHT,), duration=60)
+                                    + _every(60, length, (pygame.K_SPACE,))),
+    },
+    "weapon_spam": {
+        "setup": _setup_weapon_spam,
+        "step": None,
+        "timeline": lambda length: [(0, length, (pygame.K_LCTRL,))] + _every(90, length, (pygame.K_SPACE,)),
+    },
+    "boss_fight": {
+        "setup": _setup_boss_fight,
+        "step": None,
+        "timeline": lambda length: ([(0, length, (pygame.K_LCTRL,))]
+                                    + _every(45, length, (pygame.K_SPACE,))
+                                    + _every(200, length, (pygame.K_RIGHT,), duration=40)),
+    },
+    "bullet_hell": {
+        "setup": _setup_bullet_hell,
+        "step": _step_bullet_hell,
+        "backend": "arrays",
+        "timeline": lambda length: [(0, length, (pygame.K_LCTRL,))] + _every(90, length, (pygame.K_SPACE,)),
+    },
+}
+
+def run_benchmark(scenario_names, frames, seed):
+    """Runs each scenario for a fixed number of frames, uncapped, and prints frame time stats."""
+    global key_source, ENTITY_BACKEND
+    default_backend = ENTITY_BACKEND
+    print_frame_stats_header()
+    for name in scenario_names:
+        scenario = BENCHMARK_SCENARIOS[name]
+        random.seed(seed)
+        np.random.seed(seed)
+        ENTITY_BACKEND = scenario.get("backend", default_backend)
+        create_background()
+        scenario["setup"]()
+        key_source = ScriptedInput(scenario["timeline"](frames), frames)
+
+        frame_times = []
+        for frame in range(frames):
+            start = time.perf_counter()
+            pygame.event.pump()
+            if game_over:
+                scenario["setup"]() # Start the scenario over instead of stopping
+            update_game()
+            if scenario["step"]:
+                scenario["step"]()
+            draw_game(1.0)
+            frame_times.append(time.perf_counter() - start)
+
+        print_frame_stats(name, frame_times)
+    key_source = live_keys
+    ENTITY_BACKEND = default_backend
+
+def print_frame_stats_header():
+    print(f"{'scenario':<14}{'frames':>8}{'fps':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+
+def print_frame_stats(name, frame_times):
+    cuts = statistics.quantiles(frame_times, n=100)
+    fps = len(frame_times) / sum(frame_times)
+    print(f"{name:<14}{len(frame_times):>8}{fps:>10.1f}"
+          f"{cuts[49] * 1000:>9.2f}{cuts[94] * 1000:>9.2f}{cuts[98] * 1000:>9.2f}")
+    if profiler.enabled:
+        for stage, ms in profiler.averages().items():
+            print(f"    {stage:<20}{ms:>8.3f} ms")
+        profiler.reset()
+
+# --- Balance Simulation ---
+# Whole games run headless (no display, no rendering) under a bot policy,
+# spread over a process pool. Every worker process holds one game in its own
+# copy of the module state and plays its share of the games one after another.
+simulation_settings = {} # Set in each worker by init_simulation()
+
+def _enemy_boxes():
+    # (left, top, bottom) of every enemy, sprite or array
+    boxes = [(enemy.rect.left, enemy.rect.top, enemy.rect.bottom) for enemy in enemies]
+    if ENTITY_BACKEND == "arrays" and len(enemy_arrays):
+        left, top, _, bottom = enemy_arrays.boxes()
+        boxes += zip(left.tolist(), top.tolist(), bottom.tolist())
+    return boxes
+
+class BalanceBot:
+    """Simple player policy: always fires, jumps over enemies about to reach it
+    or to shoot ones flying above it, and walks to any collectible on screen."""
+    def __call__(self):
+        keys = {pygame.K_LCTRL}
+        ahead = [box for box in _enemy_boxes() if box[0] >= player.rect.left]
+        if ahead:
+            left, top, bottom = min(ahead)
+            distance = left - player.rect.right
+            level_with_player = top < player.rect.bottom and bottom > player.rect.top
+            if (level_with_player and distance < 120) or (bottom <= player.rect.top and distance < 400):
+                keys.add(pygame.K_SPACE)
+        target_x = 100
+        if collectibles:
+            target_x = min(collectibles, key=lambda collectible: collectible.rect.x).rect.centerx
+        if target_x < player.rect.centerx - 5:
+            keys.add(pygame.K_LEFT)
+        elif target_x > player.rect.centerx + 5:
+            keys.add(pygame.K_RIGHT)
+        return HeldKeys(keys)
+
+SIMULATION_POLICIES = {
+    "bot": lambda max_steps: BalanceBot(),
+    "fire_and_jump": lambda max_steps: ScriptedInput([(0, max_steps, (pygame.K_LCTRL,))]
+                                                     + _every(60, max_steps, (pygame.K_SPACE,)), max_steps),
+}
+
+def init_simulation(levels_file, backend, policy, max_steps, seed, enemy_stats):
+    """Pool initializer: sets this worker up to play games without a display."""
+    global levels, player, ENTITY_BACKEND
+    ENTITY_BACKEND = backend
+    for enemy_type, stats in enemy_stats.items():
+        ENEMY_TYPES[enemy_type].update(stats)
+    event_log.min_level = LOG_LEVELS["warning"] # Nobody reads a worker's log
+    levels = load_levels(levels_file)
+    create_entity_arrays()
+    player = Player(100, 500)
+    all_sprites.add(player)
+    simulation_settings.update(policy=policy, max_steps=max_steps, seed=seed)
+
+def simulate_game(game_index):
+    """Plays one game to the end (or max_steps) and returns its stats."""
+    global key_source
+    max_steps = simulation_settings["max_steps"]
+    random.seed(simulation_settings["seed"] + game_index)
+    np.random.seed((simulation_settings["seed"] + game_index) % (1 << 32))
+    reset_game()
+    key_source = SIMULATION_POLICIES[simulation_settings["policy"]](max_steps)
+    boss_step = None
+    while not game_over and sim_step < max_steps:
+        update_game()
+        if boss_step is None and enemies.count("boss"):
+            boss_step = sim_step
+    won = game_over and player.lives > 0
+    return {
+        "won": won,
+        "timed_out": not game_over,
+        "steps": sim_step,
+        "score": score,
+        "damage_taken": damage_taken,
+        "boss_kill_time": (sim_step - boss_step) / SIM_FPS if won and boss_step is not None else None,
+    }
+
+def summarize_simulations(results):
+    kill_times = [result["boss_kill_time"] for result in results if result["boss_kill_time"] is not None]
+    return {
+        "games": len(results),
+        "survival_rate": sum(result["won"] for result in results) / len(results),
+        "timeouts": sum(result["timed_out"] for result in results),
+        "boss_kill_time_mean": statistics.fmean(kill_times) if kill_times else None,
+        "boss_kill_time_p50": statistics.median(kill_times) if kill_times else None,
+        "damage_taken_mean": statistics.fmean(result["damage_taken"] for result in results),
+        "score_mean": statistics.fmean(result["score"] for result in results),
+        "score_p50": statistics.median(result["score"] for result in results),
+        "game_length_mean": statistics.fmean(result["steps"] for result in results) / SIM_FPS,
+    }
+
+def run_simulations(games, processes=None, seed=0, policy="bot", max_steps=SIM_FPS * 600,
+                    levels_file=LEVELS_FILE, backend="sprites", enemy_stats=None):
+    """Plays headless games across a process pool and returns the aggregate stats.
+
+    enemy_stats overrides ENEMY_TYPES entries, e.g. {"fast": {"health": 30}}.
+    Game i is seeded with seed + i, so a run can be repeated exactly.
+    """
+    initargs = (levels_file, backend, policy, max_steps, seed, enemy_stats or {})
+    processes = processes or os.cpu_count() or 1
+    with multiprocessing.Pool(processes, initializer=init_simulation, initargs=initargs) as pool:
+        results = list(pool.imap_unordered(simulate_game, range(games),
+                                           chunksize=max(1, games // (processes * 8))))
+    return summarize_simulations(results)
+
+def parse_enemy_stat(text):
+    # "fast.health=30" -> ("fast", "health", 30)
+    name, value = text.split("=")
+    enemy_type, stat = name.split(".")
+    if enemy_type not in ENEMY_TYPES or stat not in ENEMY_TYPES[enemy_type]:
+        raise argparse.ArgumentTypeError(f"unknown enemy stat {name}")
+    return enemy_type, stat, float(value) if "." in value else int(value)
+
+def print_simulation_summary(summary):
+    for name, value in summary.items():
+        if value is None:
+            value = "-"
+        elif isinstance(value, float):
+            value = f"{value:.3f}" if name == "survival_rate" else f"{value:.1f}"
+        print(f"{name:<22}{value:>10}")
+
+# --- Input Recording and Replay ---
+# A recording is a small header (magic, version, random seed) followed by
+# one byte per simulation step with a bit set for each key held.
+RECORDING_MAGIC = b"SHRC"
+RECORDING_VERSION = 1
+RECORDING_HEADER = struct.Struct("<4sBQ")
+RECORDED_KEYS = [pygame.K_LEFT, pygame.K_RIGHT, pygame.K_SPACE, pygame.K_LCTRL]
+
+# The held keys for every possible bitmask, so replay builds nothing per step
+KEY_STATES = [HeldKeys(key for bit, key in enumerate(RECORDED_KEYS) if mask & (1 << bit))
+              for mask in range(1 << len(RECORDED_KEYS))]
+
+class InputRecorder:
+    """Reads the keyboard for the player and records one key mask per step."""
+    def __init__(self, path, seed):
+        self.path = path
+        self.seed = seed
+        self.masks = bytearray()
+
+    def __call__(self):
+        keys = live_keys()
+        mask = 0
+        for bit, key in enumerate(RECORDED_KEYS):
+            if keys[key]:
+                mask |= 1 << bit
+        self.masks.append(mask)
+        # The player gets exactly what a replay will give it
+        return KEY_STATES[mask]
+
+    def save(self):
+        with open(self.path, "wb") as recording:
+            recording.write(RECORDING_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, self.seed))
+            recording.write(self.masks)
+
+class InputReplay:
+    """Feeds recorded key masks to the player, one per step, then asks the game to quit."""
+    def __init__(self, path):
+        with open(path, "rb") as recording:
+            data = recording.read()
+        magic, version, self.seed = RECORDING_HEADER.unpack_from(data)
+        if magic != RECORDING_MAGIC or version != RECORDING_VERSION:
+            raise ValueError(f"{path} is not a version {RECORDING_VERSION} input recording")
+        self.masks = data[RECORDING_HEADER.size:]
+        self.position = 0
+
+    def finished(self):
+        return self.position >= len(self.masks)
+
+    def __call__(self):
+        if self.finished():
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+            return KEY_STATES[0]
+        mask = self.masks[self.position]
+        self.position += 1
+        return KEY_STATES[mask]
+
+def run_replay(replay, uncapped):
+    """Plays a recording back, restarting on game over. Uncapped runs one step per frame
+    as fast as possible and prints frame time stats."""
+    global key_source
+    key_source = replay
+    if not uncapped:
+        run_game(auto_restart=True)
+        return
+    reset_game()
+    frame_times = []
+    while not replay.finished():
+        start = time.perf_counter()
+        pygame.event.pump()
+        if game_over:
+            reset_game()
+        update_game()
+        draw_game(1.0)
+        frame_times.append(time.perf_counter() - start)
+    print_frame_stats_header()
+    print_frame_stats("replay", frame_times)
+
+def main():
+    global DIRTY_RENDERING, ENTITY_BACKEND, key_source
+    startup.mark("imports")
+    parser = argparse.ArgumentParser(description="Super Hero Adventure")
+    parser.add_argument("--benchmark", nargs="*", metavar="SCENARIO",
+                        choices=sorted(BENCHMARK_SCENARIOS),
+                        help="run headless benchmark scenarios (all if none are named)")
+    parser.add_argument("--frames", type=int, default=1000, help="frames per benchmark scenario")
+    parser.add_argument("--simulate", type=int, metavar="GAMES", help="play headless balance games and print stats")
+    parser.add_argument("--processes", type=int, help="simulation worker processes (default: one per core)")
+    parser.add_argument("--policy", choices=sorted(SIMULATION_POLICIES), default="bot",
+                        help="who plays the simulated games")
+    parser.add_argument("--max-steps", type=int, default=SIM_FPS * 600, help="steps before a simulated game is cut off")
+    parser.add_argument("--tune", type=parse_enemy_stat, action="append", default=[], metavar="TYPE.STAT=VALUE",
+                        help="override an enemy stat for simulations, e.g. fast.health=30")
+    parser.add_argument("--seed", type=int, help="random seed (benchmarks default to 0, recordings to a random one)")
+    parser.add_argument("--record", metavar="PATH", help="record the random seed and key presses to a file")
+    parser.add_argument("--replay", metavar="PATH", help="play back a recording instead of reading the keyboard")
+    parser.add_argument("--headless", action="store_true", help="replay without opening a window")
+    parser.add_argument("--uncapped", action="store_true", help="replay one step per frame with no frame cap")
+    parser.add_argument("--levels", default=LEVELS_FILE, metavar="PATH", help="level data file")
+    parser.add_argument("--load", metavar="PATH", help="start from a save game (F5 saves, F9 loads, R restarts the level)")
+    parser.add_argument("--dirty-rendering", action="store_true", help="use the dirty-rectangle renderer")
+    parser.add_argument("--entity-backend", choices=["sprites", "arrays"], default=ENTITY_BACKEND,
+                        help="store projectiles and plain enemies as sprites or NumPy arrays")
+    parser.add_argument("--profile", action="store_true", help="time each frame stage (F3 toggles the overlay)")
+    parser.add_argument("--profile-csv", metavar="PATH", help="write per-frame stage timings to a CSV file")
+    parser.add_argument("--log-file", metavar="PATH", help="write game events to a file (- for stdout)")
+    parser.add_argument("--log-level", choices=list(LOG_LEVELS), default="debug", help="lowest event level kept")
+    parser.add_argument("--startup-report", action="store_true", help="print where launch time went")
+    args = parser.parse_args()
+    startup.enabled = args.startup_report
+    DIRTY_RENDERING = args.dirty_rendering
+    ENTITY_BACKEND = args.entity_backend
+    profiler.enabled = profiler.always_on = args.profile
+    if args.profile_csv:
+        profiler.open_csv(args.profile_csv)
+    event_log.min_level = LOG_LEVELS[args.log_level]
+    if args.log_file:
+        event_log.start_flusher(args.log_file)
+
+    recorder = None
+    try:
+        if args.simulate:
+            enemy_stats = collections.defaultdict(dict)
+            for enemy_type, stat, value in args.tune:
+                enemy_stats[enemy_type][stat] = value
+            summary = run_simulations(args.simulate, args.processes, args.seed or 0, args.policy,
+                                      args.max_steps, args.levels, ENTITY_BACKEND, dict(enemy_stats))
+            print_simulation_summary(summary)
+        elif args.benchmark is not None:
+            os.environ["SDL_VIDEODRIVER"] = "dummy" # No window, no vsync
+            init_game(args.levels)
+            run_benchmark(args.benchmark or list(BENCHMARK_SCENARIOS), args.frames, args.seed or 0)
+        elif args.replay:
+            replay = InputReplay(args.replay)
+            if args.headless:
+                os.environ["SDL_VIDEODRIVER"] = "dummy"
+            random.seed(replay.seed) # Before init_game() so the starfield matches too
+            init_game(args.levels)
+            run_replay(replay, args.uncapped)
+        else:
+            seed = args.seed
+            if args.record and seed is None:
+                seed = random.randrange(1 << 63)
+            if seed is not None:
+                seed %= 1 << 64 # What a recording can store, so replays seed the same way
+                random.seed(seed)
+            init_game(args.levels)
+            if args.record:
+                recorder = InputRecorder(args.record, seed)
+                key_source = recorder
+            run_game(save_path=args.load)
+    except Exception:
+        # Crash report: what the game was doing just before it went wrong
+        print("Last game events:", file=sys.stderr)
+        for line in event_log.recent(50):
+            print(line, file=sys.stderr)
+        raise
+    finally:
+        if recorder:
+            recorder.save()
+        event_log.close()
+        profiler.close()
+        pygame.quit()
 
-pygame.quit()
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,383 @@
 
+import os
+import tempfile
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 import tkinter as tk
-from tkinter import filedialog, messagebox
-from PIL import Image, ImageTk, ImageFilter, ImageOps
+from tkinter import filedialog, messagebox, ttk
+from PIL import Image, ImageTk, ImageFilter
 
 class ImageFilterBase:
     def apply(self, image):
         raise NotImplementedError("Subclasses must implement this method.")
 
-class GrayscaleFilter(ImageFilterBase):
-    def apply(self, image):
-        return image.convert("L")
+    # Called on a worker thread by FilterJob. Filters that can report progress
+    # or stop part way override this, calling job.set_progress() and checking job.cancelled
+    def run(self, image, job):
+        return self.apply(image)
+
+# Per-pixel filters are a mode conversion (if any) followed by one lookup
+# table per band, so a run of them can be fused into a single table pass
+IDENTITY_TABLE = list(range(256))
+INVERT_TABLE = [255 - value for value in range(256)]
+
+class PointFilter(ImageFilterBase):
+    # The mode the image has to be converted to before the tables are applied
+    def input_mode(self, mode):
+        return mode
+
+    # One 256-entry table per band of an image in this mode
+    def band_tables(self, mode):
+        raise NotImplementedError("Subclasses must implement this method.")
 
-class InvertFilter(ImageFilterBase):
     def apply(self, image):
-        if image.mode == 'RGBA':
-            r, g, b, a = image.split()
-            rgb = Image.merge("RGB", (r, g, b))
-            inverted = ImageOps.invert(rgb)
-            r2, g2, b2 = inverted.split()
-            return Image.merge("RGBA", (r2, g2, b2, a))
-        elif image.mode == 'RGB':
-            return ImageOps.invert(image)
+        return apply_point_filters([self], image)
+
+def apply_point_filters(filters, image):
+    tables = None
+    for point_filter in filters:
+        mode = point_filter.input_mode(image.mode)
+        if mode != image.mode:
+            image = apply_band_tables(image, tables)
+            tables = None
+            image = image.convert(mode)
+        new_tables = point_filter.band_tables(image.mode)
+        if tables is None:
+            tables = new_tables
         else:
-            return ImageOps.invert(image.convert("RGB"))
+            tables = [[new[value] for value in old] for old, new in zip(tables, new_tables)]
+    return apply_band_tables(image, tables)
+
+def apply_band_tables(image, tables):
+    if tables is None or all(table == IDENTITY_TABLE for table in tables):
+        return image # e.g. Invert twice: nothing to do
+    return image.point([value for table in tables for value in table])
+
+class GrayscaleFilter(PointFilter):
+    def input_mode(self, mode):
+        return "L"
+
+    def band_tables(self, mode):
+        return [IDENTITY_TABLE]
+
+class InvertFilter(PointFilter):
+    def input_mode(self, mode):
+        return mode if mode in ("RGBA", "RGB", "L") else "RGB"
+
+    def band_tables(self, mode):
+        # Alpha is left alone
+        return [IDENTITY_TABLE if band == "A" else INVERT_TABLE for band in mode]
+
+# One thread pool shared by everything that splits an image into tiles
+# (Pillow releases the GIL while it works on pixels, so threads use every core)
+_tile_pool = None
+
+def tile_executor():
+    global _tile_pool
+    if _tile_pool is None:
+        _tile_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+    return _tile_pool
+
+# Neighbourhood filters run tile by tile across all cores. Each tile is cut out
+# with a halo of the pixels its kernel reaches into, and only the inside is
+# kept, so the result is identical to filtering the whole image at once
+FILTER_TILE_SIZE = 512
+
+class TiledFilter(ImageFilterBase):
+    halo = 0 # Kernel radius in pixels
+
+    def apply_tile(self, tile):
+        raise NotImplementedError("Subclasses must implement this method.")
 
-class BlurFilter(ImageFilterBase):
     def apply(self, image):
-        return image.filter(ImageFilter.BLUR)
+        return self.run(image, None)
+
+    def run(self, image, job):
+        width, height = image.size
+        boxes = [(x, y, min(x + FILTER_TILE_SIZE, width), min(y + FILTER_TILE_SIZE, height))
+                 for y in range(0, height, FILTER_TILE_SIZE) for x in range(0, width, FILTER_TILE_SIZE)]
+        if len(boxes) == 1:
+            return self.apply_tile(image)
+        futures = [tile_executor().submit(self._filter_tile, image, box) for box in boxes]
+        output = None
+        for done, (box, future) in enumerate(zip(boxes, futures), 1):
+            if job and job.cancelled.is_set():
+                for pending in futures:
+                    pending.cancel()
+                return None
+            tile = future.result()
+            if output is None:
+                output = Image.new(tile.mode, image.size)
+            output.paste(tile, box)
+            if job:
+                job.set_progress(done / len(boxes))
+        return output
+
+    def _filter_tile(self, image, box):
+        width, height = image.size
+        halo = self.halo
+        source = (max(box[0] - halo, 0), max(box[1] - halo, 0),
+                  min(box[2] + halo, width), min(box[3] + halo, height))
+        filtered = self.apply_tile(image.crop(source))
+        return filtered.crop((box[0] - source[0], box[1] - source[1], box[2] - source[0], box[3] - source[1]))
+
+class BlurFilter(TiledFilter):
+    halo = 2 # BLUR is a 5x5 kernel
+
+    def apply_tile(self, tile):
+        return tile.filter(ImageFilter.BLUR)
+
+class ContourFilter(TiledFilter):
+    halo = 1 # CONTOUR is a 3x3 kernel
+
+    def apply_tile(self, tile):
+        return tile.filter(ImageFilter.CONTOUR)
+
+# Undo/redo history that stores only the tiles an edit changed. Recent steps
+# keep raw tile bytes so undo/redo is just a paste; once the memory budget is
+# used up, the steps furthest from the current image are compressed, and then
+# moved to a temporary file
+HISTORY_TILE_SIZE = 256
+HISTORY_MEMORY_BUDGET = 256 * 1024 * 1024
+HISTORY_MAX_STEPS = 100
+
+class HistoryEntry:
+    """The tiles needed to turn a neighbouring image state back into this one."""
+    def __init__(self, mode, size, boxes, chunks):
+        self.mode = mode
+        self.size = size
+        self.boxes = boxes # Tile boxes, all of them when the size or mode changed
+        self.chunks = chunks # Tile pixels, None once spilled to disk
+        self.compressed = False
+        self.lengths = None # Compressed chunk lengths, for reading them back from disk
+        self.offset = None # Position in the spill file
+        self.nbytes = sum(len(chunk) for chunk in chunks)
+
+class EditHistory:
+    def __init__(self, memory_budget=HISTORY_MEMORY_BUDGET, max_steps=HISTORY_MAX_STEPS):
+        self.memory_budget = memory_budget # Bytes of tile data kept in memory
+        self.max_steps = max_steps
+        self.undo_entries = []
+        self.redo_entries = []
+        self.memory_used = 0
+        self.spill_file = None
+        self.spilled_bytes = 0 # Bytes in the spill file still used by an entry
+
+    def can_undo(self):
+        return bool(self.undo_entries)
+
+    def can_redo(self):
+        return bool(self.redo_entries)
+
+    def clear_redo(self):
+        for entry in self.redo_entries:
+            self._forget(entry)
+        self.redo_entries.clear()
+
+    def clear(self):
+        self.undo_entries.clear()
+        self.redo_entries.clear()
+        self.memory_used = 0
+        self.spilled_bytes = 0
+        if self.spill_file:
+            self.spill_file.close()
+            self.spill_file = None
+
+    # Call after every edit with the image before and after it
+    def record(self, before, after):
+        self.clear_redo()
+        self._push(self.undo_entries, self._diff(before, after))
+        while len(self.undo_entries) > self.max_steps:
+            self._forget(self.undo_entries.pop(0))
+
+    # Both return the image to show; it may be current, changed in place
+    def undo(self, current):
+        return self._step(self.undo_entries, self.redo_entries, current)
+
+    def redo(self, current):
+        return self._step(self.redo_entries, self.undo_entries, current)
+
+    def _step(self, source, target, current):
+        entry = source.pop()
+        same_shape = entry.mode == current.mode and entry.size == current.size
+        # The way back only needs the tiles this step is about to overwrite
+        boxes = entry.boxes if same_shape else self._tile_boxes(current.size)
+        chunks = self._load(entry)
+        self._forget(entry)
+        self._push(target, self._capture(current, boxes))
+        image = current if same_shape else Image.new(entry.mode, entry.size)
+        for box, chunk in zip(entry.boxes, chunks):
+            tile_size = (box[2] - box[0], box[3] - box[1])
+            image.paste(Image.frombytes(entry.mode, tile_size, chunk), box)
+        return image
+
+    def _tile_boxes(self, size):
+        width, height = size
+        return [(x, y, min(x + HISTORY_TILE_SIZE, width), min(y + HISTORY_TILE_SIZE, height))
+                for y in range(0, height, HISTORY_TILE_SIZE) for x in range(0, width, HISTORY_TILE_SIZE)]
+
+    def _capture(self, image, boxes):
+        return HistoryEntry(image.mode, image.size, boxes, [image.crop(box).tobytes() for box in boxes])
+
+    def _diff(self, before, after):
+        # The tiles of before that the edit changed
+        if before.mode != after.mode or before.size != after.size:
+            return self._capture(before, self._tile_boxes(before.size))
+        boxes = [box for box in self._tile_boxes(before.size)
+                 if before.crop(box).tobytes() != after.crop(box).tobytes()]
+        return self._capture(before, boxes)
+
+    def _push(self, entries, entry):
+        entries.append(entry)
+        self.memory_used += entry.nbytes
+        if self.memory_used <= self.memory_budget:
+            return
+        # The steps furthest from the current image are the least likely to be needed
+        by_distance = ([(len(self.undo_entries) - i, old) for i, old in enumerate(self.undo_entries)]
+                       + [(len(self.redo_entries) - i, old) for i, old in enumerate(self.redo_entries)])
+        by_distance.sort(key=lambda item: -item[0])
+        older = [old for _, old in by_distance if old is not entry]
+        for old in older:
+            if self.memory_used <= self.memory_budget:
+                return
+            if not old.compressed:
+                self._compress(old)
+        for old in older:
+            if self.memory_used <= self.memory_budget:
+                return
+            if old.chunks is not None:
+                self._spill(old)
+
+    def _compress(self, entry):
+        entry.chunks = list(tile_executor().map(lambda chunk: zlib.compress(chunk, 1), entry.chunks))
+        entry.compressed = True
+        entry.lengths = [len(chunk) for chunk in entry.chunks]
+        self.memory_used -= entry.nbytes
+        entry.nbytes = sum(entry.lengths)
+        self.memory_used += entry.nbytes
+
+    def _spill(self, entry):
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile()
+        # The file size, not tell(): an undo may have left the position anywhere
+        elif self.spill_file.seek(0, 2) > 2 * self.spilled_bytes + self.memory_budget:
+            self._compact()
+        entry.offset = self.spill_file.seek(0, 2)
+        for chunk in entry.chunks:
+            self.spill_file.write(chunk)
+        entry.chunks = None
+        self.memory_used -= entry.nbytes
+        self.spilled_bytes += entry.nbytes
+
+    def _compact(self):
+        # Copies the spilled entries still in use to a fresh file
+        old_file = self.spill_file
+        self.spill_file = tempfile.TemporaryFile()
+        for entry in self.undo_entries + self.redo_entries:
+            if entry.chunks is None:
+                old_file.seek(entry.offset)
+                data = old_file.read(entry.nbytes)
+                entry.offset = self.spill_file.tell()
+                self.spill_file.write(data)
+        old_file.close()
+
+    def _load(self, entry):
+        # The entry's raw tile bytes
+        chunks = entry.chunks
+        if chunks is None:
+            self.spill_file.seek(entry.offset)
+            chunks = [self.spill_file.read(length) for length in entry.lengths]
+        if entry.compressed:
+            chunks = [zlib.decompress(chunk) for chunk in chunks]
+        return chunks
+
+    def _forget(self, entry):
+        if entry.chunks is None:
+            self.spilled_bytes -= entry.nbytes
+        else:
+            self.memory_used -= entry.nbytes
+
+# Downscaled copies of the image, each half the size of the one before, so a
+# zoomed-out view never has to resample the full image. Levels are built the
+# first time a zoom needs them and thrown away when the image changes
+class ImagePyramid:
+    def __init__(self):
+        self.levels = []
+
+    def set_image(self, image):
+        self.levels = [image] if image else []
+
+    # The smallest level that is still at least as big as the image at this zoom
+    def level_for(self, zoom):
+        level = 0
+        while 0.5 ** (level + 1) >= zoom and min(self.levels[level].size) > 1:
+            if level + 1 == len(self.levels):
+                self.levels.append(self.levels[level].reduce(2))
+            level += 1
+        return self.levels[level]
+
+# Filters picked in the editor but not yet applied to the full-resolution image.
+# Runs of point filters are fused into one table pass; other filters run as they are
+class FilterPipeline(ImageFilterBase):
+    def __init__(self, filters=()):
+        self.filters = list(filters)
+
+    def stages(self):
+        stages = []
+        for filter_obj in self.filters:
+            if isinstance(filter_obj, PointFilter):
+                if stages and isinstance(stages[-1], list):
+                    stages[-1].append(filter_obj)
+                else:
+                    stages.append([filter_obj])
+            else:
+                stages.append(filter_obj)
+        return stages
 
-class ContourFilter(ImageFilterBase):
     def apply(self, image):
-        return image.filter(ImageFilter.CONTOUR)
+        return self.run(image, None)
+
+    def run(self, image, job):
+        stages = self.stages()
+        for index, stage in enumerate(stages):
+            if job:
+                if job.cancelled.is_set():
+                    return None
+                job.progress_range = (index / len(stages), 1 / len(stages))
+                job.set_progress(0)
+            if isinstance(stage, list):
+                image = apply_point_filters(stage, image)
+            else:
+                image = stage.run(image, job)
+                if image is None:
+                    return None # Cancelled
+        return image
+
+# A filter running on a worker thread; the editor polls it from the Tk loop with after()
+# and calls then() once the result is in. Cancelling stops tiled filters between tiles;
+# other filters finish and the result is thrown away
+class FilterJob:
+    def __init__(self, name, filter_obj, image, executor, then=None):
+        self.name = name
+        self.filter_obj = filter_obj
+        self.image = image # The image the filter started from
+        self.then = then
+        self.progress = None # 0 to 1 when the filter reports it, None when it can't
+        self.progress_range = (0, 1) # Part of the bar the current stage fills
+        self.cancelled = threading.Event()
+        self.future = executor.submit(filter_obj.run, image, self)
+
+    def set_progress(self, fraction):
+        start, span = self.progress_range
+        self.progress = start + span * fraction
+
+    def cancel(self):
+        self.cancelled.set()
+        self.future.cancel()
+
+    def done(self):
+        return self.future.done()
 
 # This is the main application window using tkinter
 class AkramImageEditor(tk.Tk):
@@ -43,13 +390,19 @@ class AkramImageEditor(tk.Tk):
         self.tk_image = None
         self.zoom_level = 1.0
         self.zooming_in = True
-        self.history = []
-        self.future = []
+        self.history = EditHistory()
+        self.pyramid = ImagePyramid()
+        self.executor = ThreadPoolExecutor(max_workers=2) # Room for a new job while a cancelled one winds down
+        self.job = None
+        self.poll_id = None
+        self.pipeline = FilterPipeline() # Previewed on the canvas, applied in full on save
+        self.undone_filters = []
         self.start_x = None
         self.start_y = None
         self.crop_rect = None
 
         self.setup_gui()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def setup_gui(self):
         button_frame = tk.Frame(self)
@@ -73,9 +426,20 @@ class AkramImageEditor(tk.Tk):
         for name, filter_obj in filters:
             tk.Button(button_frame, text=name, command=lambda f=filter_obj: self.apply_filter(f)).pack(side=tk.LEFT, padx=5)
 
+# Shows the running filter, if any, and lets the user cancel it
+        status_frame = tk.Frame(self)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
+        self.status_label = tk.Label(status_frame, text="Ready")
+        self.status_label.pack(side=tk.LEFT)
+        self.cancel_button = tk.Button(status_frame, text="Cancel", command=self.cancel_job, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.RIGHT)
+        self.progress_bar = ttk.Progressbar(status_frame, length=200, maximum=100)
+        self.progress_bar.pack(side=tk.RIGHT, padx=5)
+
 # This canvas is where we draw and show the loaded or edited image
         self.canvas = tk.Canvas(self, bg="lightgray")
         self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.canvas.bind("<Configure>", lambda event: self.display_image())
 
         self.canvas.bind("<MouseWheel>", self.on_mouse_wheel)
         self.canvas.bind("<Button-4>", self.on_mouse_wheel)
@@ -85,11 +449,13 @@ class AkramImageEditor(tk.Tk):
         file_path = filedialog.askopenfilename(filetypes=[("Image Files", "*.jpg *.jpeg *.png *.bmp")])
         if file_path:
             try:
+                self.cancel_job()
                 self.image = Image.open(file_path).convert("RGBA")
                 self.zoom_level = 1.0
                 self.history.clear()
-                self.future.clear()
-                self.display_image()
+                self.pipeline.filters.clear()
+                self.undone_filters.clear()
+                self.image_changed()
             except Exception as e:
                 messagebox.showerror("Error", f"Could not open image:\n{str(e)}")
 
@@ -98,51 +464,150 @@ class AkramImageEditor(tk.Tk):
             file_path = filedialog.asksaveasfilename(defaultextension=".png",
                                                      filetypes=[("PNG files", "*.png"), ("JPEG files", "*.jpg")])
             if file_path:
-                try:
-                    self.image.save(file_path)
-                    messagebox.showinfo("Success", "Image saved successfully!")
-                except Exception as e:
-                    messagebox.showerror("Error", f"Could not save image:\n{str(e)}")
+                # Pending filters are applied at full resolution first
+                self.render_pipeline(lambda: self.write_image(file_path))
         else:
             messagebox.showwarning("No Image", "Please open an image first.")
 
+    def write_image(self, file_path):
+        try:
+            self.image.save(file_path)
+            messagebox.showinfo("Success", "Image saved successfully!")
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not save image:\n{str(e)}")
+
+    # Call whenever self.image is replaced or edited in place
+    def image_changed(self):
+        self.pyramid.set_image(self.image)
+        self.display_image()
+
     def display_image(self):
         if self.image:
             w, h = self.image.size
-            resized = self.image.resize((int(w * self.zoom_level), int(h * self.zoom_level)))
-            self.tk_image = ImageTk.PhotoImage(resized)
+            canvas_width = max(self.canvas.winfo_width(), 1)
+            canvas_height = max(self.canvas.winfo_height(), 1)
+            # Only the part of the zoomed image that fits on the canvas is scaled,
+            # from the pyramid level closest above the zoom, so a redraw costs
+            # about the canvas size however big the image or deep the zoom
+            view_width = max(min(int(w * self.zoom_level), canvas_width), 1)
+            view_height = max(min(int(h * self.zoom_level), canvas_height), 1)
+            left = (w - view_width / self.zoom_level) / 2
+            top = (h - view_height / self.zoom_level) / 2
+            level = self.pyramid.level_for(self.zoom_level)
+            x_scale = level.width / w
+            y_scale = level.height / h
+            box = (left * x_scale, top * y_scale, (w - left) * x_scale, (h - top) * y_scale)
+            if box[2] - box[0] == view_width and box[3] - box[1] == view_height and box == tuple(map(int, box)):
+                visible = level.crop(tuple(map(int, box))) # 1:1, nothing to resample
+            else:
+                visible = level.resize((view_width, view_height), box=box)
+            # Pending filters only ever run on this canvas-sized preview
+            if self.pipeline.filters:
+                visible = self.pipeline.apply(visible)
+            self.tk_image = ImageTk.PhotoImage(visible)
             self.canvas.delete("all")
-            self.canvas.create_image(self.canvas.winfo_width() // 2, self.canvas.winfo_height() // 2, image=self.tk_image)
+            self.canvas.create_image(canvas_width // 2, canvas_height // 2, image=self.tk_image)
 
     def apply_filter(self, filter_obj: ImageFilterBase):
         if self.image:
-            try:
-                self.save_state()
-                self.image = filter_obj.apply(self.image)
-                self.display_image()
-            except Exception as e:
-                messagebox.showerror("Error", f"Filter failed:\n{str(e)}")
+            self.pipeline.filters.append(filter_obj)
+            self.undone_filters.clear()
+            self.history.clear_redo()
+            self.display_image()
         else:
             messagebox.showwarning("No Image", "Open an image before applying filters.")
 
+# Applies the pending filters to the full-resolution image on a worker thread, then calls then()
+    def render_pipeline(self, then):
+        if not self.pipeline.filters:
+            then()
+            return
+        # A new request replaces one that hasn't finished yet
+        self.cancel_job()
+        self.job = FilterJob("Rendering", FilterPipeline(self.pipeline.filters), self.image, self.executor, then)
+        self.status_label.config(text=f"{self.job.name}...")
+        self.cancel_button.config(state=tk.NORMAL)
+        self.progress_bar.config(mode="indeterminate", value=0)
+        self.progress_bar.start()
+        if self.poll_id is None:
+            self.poll_id = self.after(50, self.poll_job)
+
+# Checks on the running filter from the Tk loop, and takes its result once it is done
+    def poll_job(self):
+        self.poll_id = None
+        job = self.job
+        if job is None:
+            return
+        if not job.done():
+            if job.progress is not None:
+                if self.progress_bar["mode"] != "determinate":
+                    self.progress_bar.stop()
+                    self.progress_bar.config(mode="determinate")
+                self.progress_bar.config(value=job.progress * 100)
+            self.poll_id = self.after(50, self.poll_job)
+            return
+        self.job = None
+        self.job_finished("Ready")
+        try:
+            result = job.future.result()
+        except Exception as e:
+            messagebox.showerror("Error", f"Filter failed:\n{str(e)}")
+            return
+        # Undo state is only recorded for filters that actually finished. Filters
+        # added while the job ran stay pending
+        del self.pipeline.filters[:len(job.filter_obj.filters)]
+        self.image = result
+        self.save_state(job.image)
+        self.image_changed()
+        if job.then:
+            job.then()
+
+    def cancel_job(self):
+        job = self.job
+        if job is None:
+            return
+        job.cancel()
+        self.job = None
+        if job.image is self.image and not job.done():
+            # The worker may still be reading the image; undo edits it in place
+            self.image = self.image.copy()
+        self.job_finished("Cancelled")
+
+    def job_finished(self, status):
+        self.progress_bar.stop()
+        self.progress_bar.config(mode="determinate", value=0)
+        self.cancel_button.config(state=tk.DISABLED)
+        self.status_label.config(text=status)
+
+    def on_close(self):
+        self.cancel_job()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
+
 # Keep track of previous image state so user can undo
-    def save_state(self):
+    def save_state(self, before):
         if self.image:
-            self.history.append(self.image.copy())
-            self.future.clear()
+            self.history.record(before, self.image)
 
 # Reverts the image to its last saved state
     def undo(self):
-        if self.history:
-            self.future.append(self.image.copy())
-            self.image = self.history.pop()
+        if self.pipeline.filters:
+            self.cancel_job() # Any render of the pending filters is out of date
+            self.undone_filters.append(self.pipeline.filters.pop())
             self.display_image()
+        elif self.history.can_undo():
+            self.cancel_job()
+            self.image = self.history.undo(self.image)
+            self.image_changed()
 
 # Restores the image to its next state if undo was pressed
     def redo(self):
-        if self.future:
-            self.history.append(self.image.copy())
-            self.image = self.future.pop()
+        if self.history.can_redo():
+            self.cancel_job()
+            self.image = self.history.redo(self.image)
+            self.image_changed()
+        elif self.undone_filters:
+            self.pipeline.filters.append(self.undone_filters.pop())
             self.display_image()
 
     def on_mouse_wheel(self, event):
@@ -205,10 +670,16 @@ class AkramImageEditor(tk.Tk):
             right = int(x2 * x_ratio)
             lower = int(y2 * y_ratio)
 
-            self.save_state()
-            self.image = self.image.crop((left, upper, right, lower))
-            self.zoom_level = 1.0
-            self.display_image()
+            # Filters keep the image size, so the box is right for the rendered image too
+            self.render_pipeline(lambda: self.crop_image((left, upper, right, lower)))
+
+    def crop_image(self, box):
+        self.cancel_job()
+        before = self.image
+        self.image = before.crop(box)
+        self.save_state(before)
+        self.zoom_level = 1.0
+        self.image_changed()
 
 if __name__ == "__main__":
     app = AkramImageEditor()